@@ -27,6 +27,24 @@ const Dashboard = () => {
     }
   };
 
+  // Results are paginated: follow next_cursor until every candidate is loaded
+  const fetchRemainingCandidates = async (jobId, firstPage) => {
+    const candidates = [...firstPage.candidates];
+    let cursor = firstPage.next_cursor;
+    while (cursor) {
+      const response = await fetch(
+        `http://127.0.0.1:8000/sourcing-jobs/${jobId}/results?limit=500&cursor=${encodeURIComponent(cursor)}`
+      );
+      if (!response.ok) {
+        throw new Error(`Failed to get job results: ${response.statusText}`);
+      }
+      const page = await response.json();
+      candidates.push(...page.candidates);
+      cursor = page.next_cursor;
+    }
+    return { ...firstPage, candidates, candidate_count: candidates.length, next_cursor: null };
+  };
+
   // Function to poll for job results
   const pollForResults = (jobId) => {
     // Stop any existing polling
@@ -37,12 +55,12 @@ const Dashboard = () => {
     pollIntervalRef.current = setInterval(async () => {
       try {
         setLoadingMessage('Checking job status...');
-        const response = await fetch(`http://127.0.0.1:8000/sourcing-jobs/${jobId}/results`);
+        const response = await fetch(`http://127.0.0.1:8000/sourcing-jobs/${jobId}/results?limit=500`);
         
         if (response.status === 200) {
           // If status is 200, the job is complete!
           clearInterval(pollIntervalRef.current); // Stop polling
-          const data = await response.json();
+          const data = await fetchRemainingCandidates(jobId, await response.json());
           setResults(data);
           setIsLoading(false);
         } else if (response.status === 400) {
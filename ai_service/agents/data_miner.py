@@ -1,136 +1,221 @@
 import requests
+import contextvars
 import json
-import os
-from config import GITHUB_ACCESS_TOKEN
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    SERPER_SEARCH_URL, GITHUB_ACCESS_TOKEN, GITHUB_API_BASE_URL, GITHUB_GRAPHQL_URL, GITHUB_ENRICH_MAX_WORKERS,
+    MINER_PAGE_SIZE, MINER_MAX_PAGES
+)
+from utils.http_client import build_http_session, RateLimitedClient
+from utils.rate_limit import get_rate_limiter
+from utils.cache import SearchCache
+from utils.profile_store import ProfileStore
+from utils.logging_setup import get_logger
+from utils.metrics import span
 
-# Ensure the GROQ_API_KEY is available for the LLM
-if not os.getenv("GROQ_API_KEY"):
-    print("Warning: GROQ_API_KEY not found in environment. The call in DataMiner might fail.")
+logger = get_logger("data_miner")
+
+GITHUB_USERS_GRAPHQL_QUERY = """
+query($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on User { id login name bio }
+  }
+}
+"""
 
 class DataMiner:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, session: requests.Session = None,
+                 search_cache: SearchCache = None, profile_store: ProfileStore = None,
+                 enrich_max_workers: int = GITHUB_ENRICH_MAX_WORKERS):
         self.serper_api_key = api_key
         self.serper_headers = {'X-API-KEY': self.serper_api_key, 'Content-Type': 'application/json'}
-        self.search_url = "https://google.serper.dev/search"
+        self.search_url = SERPER_SEARCH_URL
       
         self.github_token = GITHUB_ACCESS_TOKEN
-        self.github_api_url = "https://api.github.com/search/users"
+        self.github_api_url = f"{GITHUB_API_BASE_URL}/search/users"
+        self.github_graphql_url = GITHUB_GRAPHQL_URL
         self.github_headers = {
             'Authorization': f'token {self.github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
-        
-        # Initialize an LLM for parsing the GitHub prompt
-        self.model = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
-        print("Data Miner initialized with Groq LLM for GitHub query generation.")
 
-    def search_for_profiles(self, query: str, platform: str, job_prompt: str) -> list:
+        # A single pooled session keeps TLS connections alive across the search and
+        # enrichment calls instead of opening a new connection per request.
+        self.enrich_max_workers = max(1, enrich_max_workers)
+        self.session = session or build_http_session(pool_maxsize=self.enrich_max_workers)
+
+        # Every provider call goes through a process-wide token bucket, retries
+        # throttled responses and counts against the running job's budget. GitHub's
+        # search API has a much lower limit than its other endpoints.
+        self.serper_client = RateLimitedClient(self.session, get_rate_limiter("serper"))
+        self.github_search_client = RateLimitedClient(self.session, get_rate_limiter("github_search"))
+        self.github_client = RateLimitedClient(self.session, get_rate_limiter("github"))
+
+        # Raw search responses are reused across jobs that generate the same query, and
+        # enriched GitHub profiles are reused across jobs that surface the same candidate.
+        self.search_cache = search_cache or SearchCache()
+        self.profile_store = profile_store
+        logger.info("Data Miner initialized.")
+
+    def search_for_profiles(self, query: str, platform: str) -> list:
+        """Fetches a single page of profiles."""
+        return next(self.iter_profile_pages(query, platform, max_pages=1), [])
+
+    def iter_profile_pages(self, query: str, platform: str,
+                           max_pages: int = MINER_MAX_PAGES, page_size: int = MINER_PAGE_SIZE, start_page: int = 1,
+                           skip_links=None):
+        """
+        Lazily yields one list of profiles per result page, so callers can start
+        ranking page 1 while later pages are still being fetched, and can stop
+        early by simply not asking for more. Ends after `max_pages` pages or at the
+        first page without search results (no more results, or the search failed). `query` is the
+        platform query built by QueryArchitect.build_query. GitHub users in
+        `skip_links` (e.g. already stored for the job) are only looked up in the
+        bulk GraphQL query, never one by one, and are left out if that misses them.
+        """
         if platform == 'linkedin':
-            return self._search_linkedin(query)
+            fetch_page = lambda page: self._search_linkedin(query, page, page_size)
         elif platform == 'github':
-            # Pass the original, descriptive job_prompt for parsing
-            return self._search_github(job_prompt) 
-        return []
+            fetch_page = lambda page: self._search_github(query, page, page_size, skip_links or ())
+        else:
+            return
 
-    def _search_linkedin(self, query: str) -> list:
-        print(f"\n[Data Miner] Searching LinkedIn (via Google) with query: {query}")
-        payload = json.dumps({"q": query, "num": 10})
-        try:
-            response = requests.post(self.search_url, headers=self.serper_headers, data=payload)
+        for page in range(start_page, start_page + max_pages):
+            profiles = fetch_page(page)
+            if profiles is None:
+                return
+            # May be empty when every result on the page was skipped
+            yield profiles
+
+    def _search_linkedin(self, query: str, page: int = 1, page_size: int = MINER_PAGE_SIZE) -> list:
+        logger.info("Searching LinkedIn (via Google).", extra={"page": page, "query": query})
+        payload = {"q": query, "num": page_size}
+        if page > 1:
+            payload["page"] = page
+
+        def fetch():
+            response = self.serper_client.post(self.search_url, headers=self.serper_headers, data=json.dumps(payload))
             response.raise_for_status()
-            results = response.json().get("organic", [])
+            return response.json().get("organic", [])
+
+        try:
+            with span("search"):
+                results = self.search_cache.fetch("serper", query, payload, fetch)
+            if not results:
+                return None
             profiles = [
                 {
                     "name": r.get('title').split('-')[0].strip(), "title": r.get('title'), 
                     "link": r.get('link'), "snippet": r.get('snippet'), "source": "LinkedIn"
                 } for r in results
             ]
-            print(f"[Data Miner] -> Found {len(profiles)} potential profiles from LinkedIn.")
+            # LinkedIn profiles come whole from the (cached) search, so the profile store has nothing to save
+            logger.info("Found potential profiles from LinkedIn.", extra={"page": page, "count": len(profiles)})
             return profiles
         except Exception as e:
-            print(f"An error occurred during LinkedIn search: {e}")
-            return []
+            logger.warning("LinkedIn search failed.", extra={"page": page, "error": str(e)})
+            return None
+
+    def _search_github(self, final_query: str, page: int = 1, page_size: int = MINER_PAGE_SIZE, skip_links=()) -> list:
+        """Fetches one page of GitHub users for a prepared query and enriches them (`skip_links` without REST fallback)."""
+        logger.info("Searching GitHub API.", extra={"page": page, "query": final_query})
+        params = {'q': final_query, 'per_page': page_size, 'page': page}
+
+        def fetch():
+            response = self.github_search_client.get(self.github_api_url, headers=self.github_headers, params=params)
+            response.raise_for_status()
+            return response.json().get("items", [])
 
-    def _search_github(self, job_prompt: str) -> list:
+        try:
+            with span("search"):
+                results = self.search_cache.fetch("github", final_query, params, fetch)
+        except Exception as e:
+            logger.warning("GitHub API search failed.", extra={"page": page, "error": str(e)})
+            return None
+        if not results:
+            return None
+
+        # Reuse profiles other jobs already enriched and only enrich the rest
+        known = self.profile_store.get_many([item.get('html_url') for item in results]) if self.profile_store else {}
+        to_enrich = [item for item in results if item.get('html_url') not in known]
+        with span("enrichment"):
+            user_details = self._fetch_github_user_details(to_enrich, no_fallback=skip_links)
+
+        profiles, enriched, skipped = [], [], 0
+        for item in results:
+            if item.get('html_url') in known:
+                profiles.append(known[item['html_url']])
+                continue
+            details = user_details.get(item.get('node_id')) or {}
+            if not details and item.get('html_url') in skip_links:
+                skipped += 1
+                continue
+            profile = {
+                "name": details.get('name') or item.get('login'),
+                "title": item.get('login'), # Using login as a title fallback
+                "link": item.get('html_url'),
+                "snippet": details.get('bio') or 'No bio provided.',
+                "source": "GitHub"
+            }
+            profiles.append(profile)
+            if details:
+                enriched.append(profile)
+
+        if self.profile_store and enriched:
+            self.profile_store.upsert_many(enriched)
+
+        logger.info("Found potential profiles from GitHub API.", extra={
+            "page": page, "count": len(profiles), "reused": len(known), "enriched": len(user_details), "skipped": skipped
+        })
+        return profiles
+
+    def _fetch_github_user_details(self, items: list, no_fallback=()) -> dict:
         """
-        Performs an intelligent search via the GitHub API by first parsing the
-        job prompt into structured keywords and qualifiers.
+        Returns a mapping of node_id -> user details for the given search results.
+        Tries a single bulk GraphQL lookup first and falls back to parallel REST
+        calls for any users it could not resolve, except those whose html_url is in
+        `no_fallback`. Users that are not resolved are simply left out, so the
+        caller can still use the search result itself.
         """
-        print(f"\n[Data Miner] Parsing GitHub prompt with LLM: '{job_prompt}'")
-        
-        # 1. Use an LLM to extract structured search terms from the prompt
-        json_schema = {
-            "title": "GitHub User Search Terms",
-            "type": "object",
-            "properties": {
-                "keywords": {
-                    "type": "array", 
-                    "items": {"type": "string"},
-                    "description": "Critical skills, technologies, or roles (e.g., 'FastAPI', 'Golang', 'SRE')."
-                },
-                "language": {"type": "string", "description": "The primary programming language, if specified."},
-                "location": {"type": "string", "description": "The geographical location of the candidate."}
-            },
-            "required": ["keywords", "location"]
-        }
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert GitHub search query builder. Extract key terms from the user's job prompt to find software developers. Default to 'India' if no location is provided."),
-            ("human", "{job_prompt}")
-        ])
-        
-        chain = prompt | self.model.with_structured_output(json_schema)
-        
-        try:
-            extracted_data = chain.invoke({"job_prompt": job_prompt})
-            print(f"[Data Miner] -> LLM Extracted GitHub Terms: {extracted_data}")
-            
-            # 2. Construct a targeted search query with qualifiers
-            query_parts = extracted_data.get("keywords", [])
-            
-            if extracted_data.get("language"):
-                query_parts.append(f'language:{extracted_data["language"]}')
-            
-            if extracted_data.get("location"):
-                query_parts.append(f'location:{extracted_data["location"]}')
-
-            # ** Add filters to find established, genuine users **
-            query_parts.append('followers:>10') # Ensures user has a minimal community presence
-            query_parts.append('repos:>5')      # Ensures user has a reasonable amount of work
-            
-            final_query = " ".join(query_parts)
-            print(f"[Data Miner] -> Constructed GitHub API Query: {final_query}")
+        if not items:
+            return {}
+
+        details = self._fetch_users_graphql([item['node_id'] for item in items if item.get('node_id')])
+
+        missing = [item for item in items if item.get('node_id') not in details and item.get('html_url') not in no_fallback]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.enrich_max_workers, len(missing))) as executor:
+                # Run each lookup in a copy of this context so it is charged to the current job's budget
+                futures = [executor.submit(contextvars.copy_context().run, self._fetch_user_rest, item) for item in missing]
+                for item, user in zip(missing, (future.result() for future in futures)):
+                    if user is not None:
+                        details[item.get('node_id')] = user
+        return details
 
+    def _fetch_users_graphql(self, node_ids: list) -> dict:
+        if not node_ids:
+            return {}
+        try:
+            response = self.github_client.post(
+                self.github_graphql_url,
+                headers={'Authorization': f'bearer {self.github_token}'},
+                json={"query": GITHUB_USERS_GRAPHQL_QUERY, "variables": {"ids": node_ids}}
+            )
+            response.raise_for_status()
+            body = response.json()
+            # GraphQL returns partial data alongside per-node errors, so keep every
+            # node that resolved and let the REST fallback handle the rest.
+            nodes = (body.get("data") or {}).get("nodes") or []
+            return {node['id']: node for node in nodes if node and node.get('id')}
         except Exception as e:
-            print(f"LLM query generation failed: {e}. Falling back to basic prompt.")
-            final_query = job_prompt
+            logger.warning("Bulk GraphQL user lookup failed, falling back to REST.", extra={"error": str(e)})
+            return {}
 
-        # 3. Execute the search with the improved query
-        params = {'q': final_query, 'per_page': 10}
+    def _fetch_user_rest(self, item: dict):
         try:
-            response = requests.get(self.github_api_url, headers=self.github_headers, params=params)
+            response = self.github_client.get(item['url'], headers=self.github_headers)
             response.raise_for_status()
-            results = response.json().get("items", [])
-            
-            profiles = []
-            for item in results:
-                # The N+1 call is acceptable here to get rich profile data like the bio
-                user_details_resp = requests.get(item['url'], headers=self.github_headers)
-                user_details_resp.raise_for_status()
-                user_details = user_details_resp.json()
-                
-                profiles.append({
-                    "name": user_details.get('name') or item.get('login'),
-                    "title": item.get('login'), # Using login as a title fallback
-                    "link": item.get('html_url'),
-                    "snippet": user_details.get('bio', 'No bio provided.'), 
-                    "source": "GitHub"
-                })
-            
-            print(f"[Data Miner] -> Found {len(profiles)} potential profiles from GitHub API.")
-            return profiles
+            return response.json()
         except Exception as e:
-            print(f"An error occurred during GitHub API search: {e}")
-            return []
\ No newline at end of file
+            logger.warning("Could not fetch GitHub user details.", extra={"login": item.get('login'), "error": str(e)})
+            return None
@@ -1,19 +1,49 @@
 from utils.database import TalentPipelineDB
+from config import PIPELINE_FLUSH_SIZE
+from utils.logging_setup import get_logger
+from utils.metrics import registry, span
+
+logger = get_logger("pipeline_manager")
 
 class PipelineManager:
-    def __init__(self, db_instance: TalentPipelineDB, job_id: str):
+    def __init__(self, db_instance: TalentPipelineDB, job_id: str, flush_size: int = PIPELINE_FLUSH_SIZE):
         self.db = db_instance
         self.job_id = job_id
-        print(f" Pipeline Manager initialized for job_id: {self.job_id}.")
-
-    def process_and_store(self, ranked_profiles: list):
-        print(f"\n[Pipeline Manager] Processing and storing {len(ranked_profiles)} candidates...")
-        if not ranked_profiles:
-            print("[Pipeline Manager] -> No new profiles to process.")
-            return
+        self.flush_size = max(1, flush_size)
+        self._pending = []
+        self.totals = {"inserted": 0, "duplicates": 0, "failed": 0, "updated": 0}
+        logger.debug("Pipeline Manager initialized.", extra={"job_id": self.job_id})
 
+    def add(self, ranked_profiles: list):
+        """Buffers ranked profiles, writing them out whenever a full batch is pending."""
         for profile in ranked_profiles:
-            profile['name'] = profile['name'].title()
-            self.db.add_candidate(profile, self.job_id)
-            
-        print("[Pipeline Manager] -> Finished processing batch.")
\ No newline at end of file
+            profile['name'] = (profile.get('name') or '').title()
+            self._pending.append(profile)
+            if len(self._pending) >= self.flush_size:
+                self.flush()
+
+    def flush(self) -> dict:
+        """Writes all buffered profiles in a single bulk round-trip."""
+        if not self._pending:
+            return self.totals
+        batch, self._pending = self._pending, []
+        with span("db_write"):
+            result = self.db.add_candidates(batch, self.job_id)
+        for key in self.totals:
+            self.totals[key] += result.get(key, 0)
+        for key, label in (("inserted", "inserted"), ("duplicates", "duplicate"), ("failed", "failed")):
+            if result.get(key):
+                registry.inc("scoutly_candidates_stored_total", result[key], result=label)
+        return self.totals
+
+    def update(self, rescored_profiles: list):
+        """Overwrites the stored rows of candidates that were rescored because their profile changed."""
+        if not rescored_profiles:
+            return
+        for profile in rescored_profiles:
+            profile['name'] = (profile.get('name') or '').title()
+        with span("db_write"):
+            updated = self.db.update_candidates(rescored_profiles, self.job_id)
+        self.totals["updated"] += updated
+        if updated:
+            registry.inc("scoutly_candidates_stored_total", updated, result="updated")
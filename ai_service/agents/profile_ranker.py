@@ -1,58 +1,191 @@
+import heapq
+import itertools
+import math
 import os
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
+from config import RANKER_MAX_CONCURRENCY, PREFILTER_TOP_K, PREFILTER_MIN_SIMILARITY
+from utils.cache import LLMCache
+from utils.rate_limit import BudgetExceeded
+from utils.relevance import select_relevant
+from utils.logging_setup import get_logger
+from utils.metrics import span
+
+logger = get_logger("profile_ranker")
 
 if not os.getenv("GROQ_API_KEY"):
-    print("GROQ_API_KEY not found in environment. The call might fail.")
+    logger.warning("GROQ_API_KEY not found in environment. The call might fail.")
 
-class ProfileRanker:
-    def __init__(self):
-        self.model = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
-        print("Profile Ranker initialized with Groq LLM.")
+RANKING_SCHEMA = {
+    "title": "Candidate Score",
+    "type": "object",
+    "properties": {
+        "match_score": {"type": "integer"},
+        "reasoning": {"type": "string"}
+    },
+    "required": ["match_score", "reasoning"]
+}
 
-    def rank_profiles(self, raw_profiles: list, job_prompt: str) -> list:
-        if not raw_profiles:
-            print("[Profile Ranker] -> No profiles to rank.")
-            return []
+RANKING_SYSTEM_PROMPT = """You are an expert technical recruiter. Your task is to score a candidate's profile based on a job description.
+            Analyze the candidate's title and snippet. Provide a match score from 1 (poor match) to 100 (perfect match) and a brief, one-sentence justification.
+            Base your score primarily on the skills and experience mentioned in the profile snippet."""
+
+class ScoringShortlist:
+    """
+    Spreads one campaign's LLM budget (`top_k` profiles, 0 = unlimited) over the
+    `pages` it may mine. Each page scores its share of what is left (the budget
+    over the pages still to come), its most similar profiles first; the others
+    that passed the pre-filter are held back, at most `top_k` of them by
+    similarity. Once mining stops, whatever budget is left goes to the best of
+    those (drain), so the campaign scores the best profiles across every page it
+    mined rather than whichever came first. Similarities come from each page's
+    own TF-IDF model, which makes them comparable only roughly.
+    """
 
-        print(f"\n[Profile Ranker]  Ranking {len(raw_profiles)} profiles against job prompt...")
+    def __init__(self, top_k: int, pages: int):
+        self.remaining = top_k if top_k else None
+        self.pages_left = max(1, pages)
+        self.reserve = []
+        self._order = itertools.count()
 
-        json_schema = {
-            "title": "Candidate Score",
-            "type": "object",
-            "properties": {
-                "match_score": {"type": "integer"},
-                "reasoning": {"type": "string"}
-            },
-            "required": ["match_score", "reasoning"]
-        }
+    def take(self, candidates: list) -> list:
+        """Returns the profiles of one page to score now; `candidates` are (similarity, profile), best first."""
+        if self.remaining is None:
+            return [profile for _, profile in candidates]
+        quota = min(self.remaining, math.ceil(self.remaining / self.pages_left))
+        self.pages_left = max(1, self.pages_left - 1)
+        for similarity, profile in candidates[quota:]:
+            heapq.heappush(self.reserve, (similarity, next(self._order), profile))
+            if len(self.reserve) > self.remaining:
+                heapq.heappop(self.reserve)
+        taken = [profile for _, profile in candidates[:quota]]
+        self.remaining -= len(taken)
+        return taken
+
+    def drain(self) -> list:
+        """Returns the best held back profiles the remaining budget allows, and spends it on them."""
+        if not self.remaining:
+            return []
+        best = [profile for _, _, profile in heapq.nlargest(self.remaining, self.reserve)]
+        self.reserve = []
+        self.remaining -= len(best)
+        return best
+
+class ProfileRanker:
+    def __init__(self, model: ChatGroq = None, cache: LLMCache = None, max_concurrency: int = RANKER_MAX_CONCURRENCY,
+                 prefilter_top_k: int = PREFILTER_TOP_K, prefilter_min_similarity: float = PREFILTER_MIN_SIMILARITY):
+        self.model = model or ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
+        self.cache = cache or LLMCache()
+        self.max_concurrency = max(1, max_concurrency)
+        self.prefilter_top_k = prefilter_top_k
+        self.prefilter_min_similarity = prefilter_min_similarity
 
         prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert technical recruiter. Your task is to score a candidate's profile based on a job description.
-            Analyze the candidate's title and snippet. Provide a match score from 1 (poor match) to 100 (perfect match) and a brief, one-sentence justification.
-            Base your score primarily on the skills and experience mentioned in the profile snippet."""),
+            ("system", RANKING_SYSTEM_PROMPT),
             ("human", "Job Prompt: {job_prompt}\n\nCandidate Profile:\nTitle: {candidate_title}\nSnippet: {candidate_snippet}")
         ])
-        
-        chain = prompt | self.model.with_structured_output(json_schema)
-        ranked_profiles = []
-
-        for profile in raw_profiles:
-            try:
-                result = chain.invoke({
-                    "job_prompt": job_prompt,
-                    "candidate_title": profile.get('title', ''),
-                    "candidate_snippet": profile.get('snippet', '')
-                })
-                profile['match_score'] = result.get('match_score')
-                profile['reasoning'] = result.get('reasoning')
-                print(f"  -> Scored '{profile['name']}': {profile['match_score']}/100")
-            except Exception as e:
-                print(f"  -> Could not rank profile for '{profile.get('name', 'Unknown')}': {e}")
-                profile['match_score'] = 0
-                profile['reasoning'] = "Ranking failed due to an error."
-            ranked_profiles.append(profile)
-        
-        ranked_profiles.sort(key=lambda p: p.get('match_score', 0), reverse=True)
-        print("[Profile Ranker] -> Finished ranking all profiles.")
-        return ranked_profiles
\ No newline at end of file
+        self.chain = prompt | self.model.with_structured_output(RANKING_SCHEMA)
+        logger.info("Profile Ranker initialized.", extra={"max_concurrency": self.max_concurrency})
+
+    def new_shortlist(self, pages: int) -> ScoringShortlist:
+        """A ScoringShortlist holding one campaign's `prefilter_top_k` budget across `pages` result pages."""
+        return ScoringShortlist(self.prefilter_top_k, pages)
+
+    def prefilter(self, raw_profiles: list, job_prompt: str, job_spec: dict = None) -> list:
+        """
+        Cheap first stage that runs locally: keeps only the profiles whose title and
+        snippet are most similar to the job prompt (TF-IDF cosine), so LLM cost stays
+        roughly constant however many profiles were mined. The job spec's title and
+        skills, when given, are added to the prompt's terms. Returns at most
+        `prefilter_top_k` (similarity, profile) pairs, most similar first.
+        """
+        query = job_prompt
+        if job_spec:
+            query = " ".join([job_prompt, job_spec.get("job_title") or ""] + list(job_spec.get("skills", [])))
+        documents = [f"{p.get('title') or ''} {p.get('snippet') or ''}" for p in raw_profiles]
+        keep = select_relevant(query, documents, self.prefilter_top_k, self.prefilter_min_similarity)
+        if len(keep) < len(raw_profiles):
+            logger.info("Pre-filter kept profiles for LLM scoring.", extra={"kept": len(keep), "count": len(raw_profiles)})
+        return [(similarity, raw_profiles[i]) for i, similarity in keep]
+
+    def rank_profiles(self, raw_profiles: list, job_prompt: str, on_scored=None, job_spec: dict = None,
+                      shortlist: ScoringShortlist = None) -> list:
+        """
+        Pre-filters the profiles (then lets `shortlist`, if given, pick this page's
+        share), scores the remaining ones against the job prompt and returns them
+        best match first. `on_scored(profile)` is called as each score comes in.
+        """
+        callback = (lambda _, profile: on_scored(profile)) if on_scored else None
+        shortlists = [shortlist] if shortlist else None
+        return self.rank_for_prompts(raw_profiles, [(job_prompt, job_spec)], on_scored=callback, shortlists=shortlists)[0]
+
+    def rank_for_prompts(self, raw_profiles: list, prompts: list, on_scored=None, shortlists: list = None) -> list:
+        """
+        Scores one page of profiles against several job prompts at once. `prompts`
+        is a list of (job_prompt, job_spec); each prompt gets its own pre-filter
+        (followed by the matching entry of `shortlists`, if given) and every
+        selected (prompt, profile) pair is scored in one pass (see score_for_prompts).
+        """
+        selections = []
+        for index, (job_prompt, job_spec) in enumerate(prompts):
+            candidates = self.prefilter(raw_profiles, job_prompt, job_spec) if raw_profiles else []
+            if shortlists:
+                selections.append(shortlists[index].take(candidates))
+            else:
+                selections.append([profile for _, profile in candidates])
+        return self.score_for_prompts(prompts, selections, on_scored=on_scored)
+
+    def score_for_prompts(self, prompts: list, selections: list, on_scored=None) -> list:
+        """
+        Scores each prompt's selected profiles against it: `prompts` is a list of
+        (job_prompt, job_spec) and `selections` one list of profiles per prompt. Each
+        prompt gets its own copies of the profiles, and every (prompt, profile) pair
+        goes into a single batched LLM pass. Returns one best-first list per prompt.
+        Profiles that could not be scored (the LLM call failed after its retries, or
+        the job's budget ran out) have no match_score and are marked `score_failed`.
+        `on_scored(prompt_index, profile)` is called as each score comes in.
+        """
+        pairs = [(index, dict(profile)) for index, profiles in enumerate(selections) for profile in profiles]
+        if not pairs:
+            logger.info("No profiles to rank.")
+            return [[] for _ in prompts]
+        logger.info("Ranking profiles against job prompts.", extra={"count": len(pairs), "prompts": len(prompts)})
+
+        inputs = [
+            {
+                "job_prompt": prompts[index][0],
+                "candidate_title": profile.get('title', ''),
+                "candidate_snippet": profile.get('snippet', '')
+            } for index, profile in pairs
+        ]
+
+        def apply_score(position: int, result):
+            index, profile = pairs[position]
+            if isinstance(result, Exception) or not isinstance(result, dict):
+                if not isinstance(result, BudgetExceeded):
+                    logger.warning("Could not rank profile.", extra={"link": profile.get('link'), "error": str(result)})
+                profile['match_score'] = None
+                profile['score_failed'] = True
+                return
+            profile['match_score'] = result.get('match_score')
+            profile['reasoning'] = result.get('reasoning')
+            logger.debug("Scored profile.", extra={"link": profile.get('link'), "match_score": profile['match_score']})
+            if on_scored:
+                on_scored(index, profile)
+
+        # Score all pairs in one batched pass. Pairs already scored come from the
+        # cache; the rest fan out over a bounded thread pool, and a failed call
+        # comes back as an exception instead of discarding the other scores.
+        with span("rank"):
+            self.cache.batch(
+                self.chain, self.model, RANKING_SYSTEM_PROMPT, RANKING_SCHEMA, inputs,
+                config={"max_concurrency": self.max_concurrency}, on_result=apply_score
+            )
+
+        ranked = [[] for _ in prompts]
+        for index, profile in pairs:
+            ranked[index].append(profile)
+        for profiles in ranked:
+            profiles.sort(key=lambda p: p.get('match_score') or 0, reverse=True)
+        logger.info("Finished ranking all profiles.", extra={"count": len(pairs)})
+        return ranked
@@ -1,57 +1,107 @@
 import os
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
+from utils.cache import LLMCache
+from utils.logging_setup import get_logger
+from utils.metrics import span
+
+logger = get_logger("query_architect")
 
 if not os.getenv("GROQ_API_KEY"):
-    print("GROQ_API_KEY not found in environment. The call might fail.")
+    logger.warning("GROQ_API_KEY not found in environment. The call might fail.")
+
+PLATFORM_SITE_DIRECTIVES = {
+    'linkedin': 'site:linkedin.com/in/',
+    'github': 'site:github.com'
+}
+
+# Used when the prompt names no location. GitHub's free-text location filter is
+# strict, so it searches the whole country rather than a single city.
+PLATFORM_DEFAULT_LOCATIONS = {
+    'linkedin': 'Pune, Maharashtra',
+    'github': 'India'
+}
+
+JOB_SPEC_SYSTEM_PROMPT = """You are an expert recruitment assistant. Your task is to analyze a job description and extract key information in a clean JSON format.
+            Infer seniority from experience requirements. Focus only on the most critical professional skills, technologies and tools, and the job title.
+            Give the primary programming language only if the description names one. If no location is mentioned, leave the location empty."""
+
+JOB_SPEC_SCHEMA = {
+    "title": "Extracted Information from Job Description",
+    "type": "object",
+    "properties": {
+        "job_title": {"type": "string"},
+        "seniority": {"type": "string", "description": "e.g. 'Junior', 'Mid-level', 'Senior', 'Lead'."},
+        "skills": {"type": "array", "items": {"type": "string"}},
+        "language": {"type": "string", "description": "The primary programming language, if specified."},
+        "location": {"type": "string"}
+    },
+    "required": ["job_title", "skills", "location"]
+}
 
 class QueryArchitect:
-    def __init__(self):
-        self.model = ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
-        print("Query Architect initialized with Groq LLM (llama3-70b-8192).")
-
-    def create_query(self, job_prompt: str, platform: str) -> str:
-        print(f"\n[Query Architect]   Processing prompt for {platform.upper()}: '{job_prompt}'")
-
-        if platform == 'linkedin':
-            site_directive = 'site:linkedin.com/in/'
-            system_prompt = """You are an expert recruitment assistant. Your task is to analyze a job description for a LinkedIn search and extract key information in a clean JSON format.
-            Infer seniority from experience requirements. Focus only on the most critical professional skills and the job title. If no location is mentioned, default to Pune, Maharashtra."""
-        elif platform == 'github':
-            site_directive = 'site:github.com'
-            system_prompt = """You are an expert recruitment assistant. Your task is to analyze a job description for a GitHub user search and extract key information in a clean JSON format.
-            Focus only on the most critical technical skills, languages, or tools that might appear in repositories. If no location is mentioned, default to Pune, Maharashtra."""
-        else:
-            raise ValueError("Unsupported platform specified. Use 'linkedin' or 'github'.")
+    """
+    Turns a job prompt into a structured job spec with a single LLM call, and builds
+    each platform's search query from that spec. The spec is shared by every stage
+    and platform of a job and is stored on the job document, so reruns reuse it.
+    """
 
-        json_schema = {
-            "title": "Extracted Information from Job Description",
-            "type": "object",
-            "properties": {
-                "job_title": {"type": "string"},
-                "skills": {"type": "array", "items": {"type": "string"}},
-                "location": {"type": "string"}
-            },
-            "required": ["job_title", "skills", "location"]
-        }
+    def __init__(self, model: ChatGroq = None, cache: LLMCache = None):
+        self.model = model or ChatGroq(model="llama-3.3-70b-versatile", temperature=0)
+        self.cache = cache or LLMCache()
 
-        prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{job_prompt}")])
-        chain = prompt | self.model.with_structured_output(json_schema)
+        # The chain does not depend on the job, so build it once and reuse it for every job
+        prompt = ChatPromptTemplate.from_messages([("system", JOB_SPEC_SYSTEM_PROMPT), ("human", "{job_prompt}")])
+        self.chain = prompt | self.model.with_structured_output(JOB_SPEC_SCHEMA)
+        logger.info("Query Architect initialized.")
 
+    def extract_job_spec(self, job_prompt: str):
+        """Returns the structured job spec for a prompt, or None if the LLM call failed."""
+        logger.info("Extracting job spec from prompt.", extra={"job_prompt": job_prompt})
         try:
-            extracted_data = chain.invoke({"job_prompt": job_prompt})
-            print(f"[Query Architect] -> LLM Extracted Data: {extracted_data}")
-            
-            job_title = extracted_data.get("job_title", "Software Engineer")
-            skills = extracted_data.get("skills", [])
-            location = extracted_data.get("location", "Pune")
-            
-            query_parts = [site_directive, f'"{job_title}"', f'"{location}"']
-            query_parts.extend([f'"{skill}"' for skill in skills])
-            query = " ".join(query_parts)
-            
-            print(f"[Query Architect] -> Generated Query: {query}")
-            return query
+            with span("job_spec"):
+                job_spec = self.cache.invoke(self.chain, self.model, JOB_SPEC_SYSTEM_PROMPT, JOB_SPEC_SCHEMA, {"job_prompt": job_prompt})
+            logger.info("LLM extracted job spec.", extra={"job_spec": job_spec})
+            return job_spec if isinstance(job_spec, dict) else None
         except Exception as e:
-            print(f"Error during LLM processing in QueryArchitect: {e}")
-            return f'{site_directive} "{job_prompt}"'
\ No newline at end of file
+            logger.warning("Job spec extraction failed.", extra={"error": str(e)})
+            return None
+
+    def build_query(self, job_spec: dict, platform: str, job_prompt: str) -> str:
+        """
+        Builds the search query for `platform` from a job spec: a Google query for
+        LinkedIn, or a GitHub user search query with qualifiers. Falls back to the raw
+        prompt when there is no spec, and to the platform's default location when
+        the spec has none.
+        """
+        if platform not in PLATFORM_SITE_DIRECTIVES:
+            raise ValueError("Unsupported platform specified. Use 'linkedin' or 'github'.")
+
+        if platform == 'github':
+            query = self._build_github_query(job_spec) if job_spec else job_prompt
+        elif job_spec:
+            job_title = job_spec.get("job_title") or "Software Engineer"
+            location = job_spec.get("location") or PLATFORM_DEFAULT_LOCATIONS[platform]
+            query_parts = [PLATFORM_SITE_DIRECTIVES[platform], f'"{job_title}"', f'"{location}"']
+            query_parts.extend([f'"{skill}"' for skill in job_spec.get("skills", [])])
+            query = " ".join(query_parts)
+        else:
+            query = f'{PLATFORM_SITE_DIRECTIVES[platform]} "{job_prompt}"'
+
+        logger.info("Generated search query.", extra={"platform": platform, "query": query})
+        return query
+
+    def _build_github_query(self, job_spec: dict) -> str:
+        query_parts = list(job_spec.get("skills", []))
+
+        if job_spec.get("language"):
+            query_parts.append(f'language:{job_spec["language"]}')
+
+        # GitHub matches free-text locations, so use the city rather than "City, State"
+        city = (job_spec.get("location") or PLATFORM_DEFAULT_LOCATIONS['github']).split(",")[0].strip()
+        query_parts.append(f'location:"{city}"' if " " in city else f'location:{city}')
+
+        # ** Add filters to find established, genuine users **
+        query_parts.append('followers:>10') # Ensures user has a minimal community presence
+        query_parts.append('repos:>5')      # Ensures user has a reasonable amount of work
+        return " ".join(query_parts)
@@ -0,0 +1 @@
+"""Offline benchmark harness for the sourcing pipeline; see run_benchmark.py."""
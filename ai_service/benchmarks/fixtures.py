@@ -0,0 +1,50 @@
+# benchmarks/fixtures.py
+import json
+
+FIXTURE_KINDS = {"job", "serper", "github_search", "github_user", "llm"}
+
+class Fixtures:
+    """
+    Recorded provider traffic loaded from a JSONL capture, one object per line with a
+    `kind` field:
+
+      {"kind": "job", "linkedin_prompt": ..., "github_prompt": ...}
+      {"kind": "serper", "response": {"organic": [...]}}
+      {"kind": "github_search", "response": {"items": [{"login", "node_id", "html_url"}]}}
+      {"kind": "github_user", "login": ..., "node_id": ..., "response": {"name", "bio"}}
+      {"kind": "llm", "schema": "<schema title>", "response": {...}}
+
+    Search pages are replayed in order of capture, so page N of every query returns
+    the N-th recorded page.
+    """
+
+    def __init__(self, records: list):
+        self.jobs = []
+        self.serper_pages = []
+        self.github_search_pages = []
+        self.github_users = {}
+        self.llm_responses = {}
+        for record in records:
+            kind = record.get("kind")
+            if kind not in FIXTURE_KINDS:
+                raise ValueError(f"Unknown fixture kind '{kind}'.")
+            if kind == "job":
+                self.jobs.append({"linkedin_prompt": record.get("linkedin_prompt"), "github_prompt": record.get("github_prompt")})
+            elif kind == "serper":
+                self.serper_pages.append(record["response"])
+            elif kind == "github_search":
+                self.github_search_pages.append(record["response"])
+            elif kind == "github_user":
+                self.github_users[record["login"]] = dict(record["response"], node_id=record["node_id"], login=record["login"])
+            else:
+                self.llm_responses[record["schema"]] = record["response"]
+        if not self.jobs:
+            raise ValueError("The fixtures do not contain any 'job' records to run.")
+
+    @classmethod
+    def load(cls, path: str) -> "Fixtures":
+        with open(path, encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def users_by_node_id(self) -> dict:
+        return {user["node_id"]: user for user in self.github_users.values()}
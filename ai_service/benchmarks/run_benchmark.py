@@ -0,0 +1,302 @@
+# benchmarks/run_benchmark.py
+"""
+Offline benchmark for the sourcing pipeline. Replays recorded fixtures through a
+stub HTTP server, a fake LLM and mongomock (or a local mongod), drives
+run_sourcing_task and the FastAPI endpoints at a configurable job concurrency, and
+reports per-stage latency percentiles, jobs per second and peak memory.
+
+Run from ai_service/:  python -m benchmarks.run_benchmark --jobs 20 --concurrency 4
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.fixtures import Fixtures
+from benchmarks.stub_server import StubProviderServer
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "sample_capture.jsonl")
+
+class StageTimer:
+    """Collects wall-clock durations per named stage from any thread."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": _percentile(values, 50) * 1000,
+                "p95_ms": _percentile(values, 95) * 1000,
+                "p99_ms": _percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000
+            }
+            for stage, values in samples.items()
+        }
+
+def _percentile(sorted_values: list, percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * percent / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def configure_environment(args, stub: StubProviderServer):
+    """Points the service at the stand-ins. Must run before any service module is imported."""
+    os.environ.setdefault("SERPER_API_KEY", "benchmark")
+    os.environ.setdefault("GITHUB_ACCESS_TOKEN", "benchmark")
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["SERPER_SEARCH_URL"] = f"{stub.base_url}/search"
+    os.environ["GITHUB_API_BASE_URL"] = stub.base_url
+    os.environ["GITHUB_GRAPHQL_URL"] = f"{stub.base_url}/graphql"
+    os.environ["PROVIDER_BACKOFF_BASE_SECONDS"] = "0.01"
+    if not args.provider_rate_limits:
+        for name in ("SERPER_RATE_PER_SECOND", "GITHUB_SEARCH_RATE_PER_SECOND", "GITHUB_RATE_PER_SECOND", "GROQ_RATE_PER_SECOND"):
+            os.environ[name] = "100000"
+        os.environ["RATE_LIMIT_BURST"] = "100000"
+    if args.no_cache:
+        os.environ["LLM_CACHE_TIERS"] = ""
+        os.environ["SEARCH_CACHE_TIERS"] = ""
+        os.environ["PROFILE_STORE_MAX_AGE_SECONDS"] = "0"
+
+def build_services(args, fixtures: Fixtures, timer: StageTimer):
+    from utils.database import TalentPipelineDB
+    from utils.services import Services, set_services, run_startup_migrations
+    from utils.rate_limit import RateLimitedChatModel, get_rate_limiter
+
+    if args.mongo_url:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_url)
+        client.drop_database("talent_pipeline_db")
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+
+    llm = FakeChatModel(fixtures.llm_responses, latency_seconds=args.llm_latency_ms / 1000)
+    # Wrapped like the production Groq client, so LLM calls are rate limited, retried and timed the same way
+    services = Services(db=TalentPipelineDB(client=client), llm=RateLimitedChatModel(llm, get_rate_limiter("groq")))
+    run_startup_migrations(services.db)
+
+    # Time each stage by wrapping the shared agents' entry points on these instances
+    services.architect.extract_job_spec = timer.wrap("job_spec", services.architect.extract_job_spec)
+    services.miner._search_linkedin = timer.wrap("mine_page.linkedin", services.miner._search_linkedin)
+    services.miner._search_github = timer.wrap("mine_page.github", services.miner._search_github)
+    # Every ranking path (pages, held back profiles, batches) ends in score_for_prompts
+    services.ranker.score_for_prompts = timer.wrap("rank_page", services.ranker.score_for_prompts)
+    services.db.add_candidates = timer.wrap("store", services.db.add_candidates)
+    set_services(services)
+    return services, llm
+
+def run_pipeline_jobs(args, fixtures: Fixtures, services, timer: StageTimer) -> list:
+    """Creates the jobs directly and runs them the way a worker would."""
+    import worker
+
+    def run_one(index: int) -> str:
+        spec = fixtures.jobs[index % len(fixtures.jobs)]
+        job_id = f"bench-{index:05d}"
+        services.db.create_job(job_id, spec["linkedin_prompt"], spec["github_prompt"])
+        started = time.perf_counter()
+        status = worker.run_sourcing_task(job_id, spec["linkedin_prompt"], spec["github_prompt"])
+        timer.record("job", time.perf_counter() - started)
+        return status
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        return list(executor.map(run_one, range(args.jobs)))
+
+def run_batch_jobs(args, fixtures: Fixtures, services, timer: StageTimer) -> list:
+    """Submits the jobs as batches of `--concurrency` roles and runs each batch the way a worker would."""
+    import worker
+
+    statuses = []
+    for first in range(0, args.jobs, args.concurrency):
+        indexes = range(first, min(args.jobs, first + args.concurrency))
+        roles = [fixtures.jobs[index % len(fixtures.jobs)] for index in indexes]
+        batch_id = f"bench-batch-{first:05d}"
+        job_ids = services.db.create_batch(batch_id, roles)
+        started = time.perf_counter()
+        worker.run_batch_task(batch_id, job_ids)
+        timer.record("batch", time.perf_counter() - started)
+        statuses.extend(services.db.get_job(job_id)["status"] for job_id in job_ids)
+    return statuses
+
+def run_api_jobs(args, fixtures: Fixtures, services, timer: StageTimer) -> list:
+    """Submits the jobs through the API, runs them as a worker would, then reads every result page back."""
+    from fastapi.testclient import TestClient
+    from utils.async_database import AsyncTalentPipelineDB, set_async_db
+
+    # The endpoints use the async data layer; point it at the same database as the workers
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        set_async_db(AsyncTalentPipelineDB(client=AsyncIOMotorClient(args.mongo_url)))
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        set_async_db(AsyncTalentPipelineDB(client=AsyncMongoMockClient(mock_mongo_client=services.db.client)))
+
+    import main
+    import worker
+
+    def run_one(client, index: int) -> str:
+        spec = fixtures.jobs[index % len(fixtures.jobs)]
+        started = time.perf_counter()
+        response = client.post("/sourcing-jobs", json=spec)
+        timer.record("api.create_job", time.perf_counter() - started)
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+
+        # Run the job the way a worker would once it has claimed it from the queue
+        job_started = time.perf_counter()
+        status = worker.run_sourcing_task(job_id, spec["linkedin_prompt"], spec["github_prompt"])
+        timer.record("job", time.perf_counter() - job_started)
+
+        cursor = None
+        while status in ("completed", "partially_completed"):
+            params = {"limit": args.page_limit}
+            if cursor:
+                params["cursor"] = cursor
+            started = time.perf_counter()
+            response = client.get(f"/sourcing-jobs/{job_id}/results", params=params)
+            timer.record("api.results_page", time.perf_counter() - started)
+            response.raise_for_status()
+            cursor = response.json().get("next_cursor")
+            if not cursor:
+                break
+
+        started = time.perf_counter()
+        client.get("/sourcing-jobs", params={"limit": 20}).raise_for_status()
+        timer.record("api.list_jobs", time.perf_counter() - started)
+        return status
+
+    with TestClient(main.app) as client:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            return list(executor.map(lambda index: run_one(client, index), range(args.jobs)))
+
+def compare_with_baseline(report: dict, baseline: dict, max_regression: float) -> list:
+    """Returns a description of every metric that regressed by more than `max_regression`."""
+    regressions = []
+    old_rate, new_rate = baseline.get("jobs_per_second") or 0, report["jobs_per_second"]
+    if old_rate and new_rate < old_rate * (1 - max_regression):
+        regressions.append(f"jobs_per_second {old_rate:.2f} -> {new_rate:.2f}")
+    for stage, old in baseline.get("stages", {}).items():
+        new = report["stages"].get(stage)
+        if not new:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if old[metric] and new[metric] > old[metric] * (1 + max_regression):
+                regressions.append(f"{stage} {metric} {old[metric]:.1f} -> {new[metric]:.1f}")
+    return regressions
+
+def print_report(report: dict):
+    print("\n=== Sourcing pipeline benchmark ===")
+    print(f"mode={report['mode']} jobs={report['jobs']} concurrency={report['concurrency']} "
+          f"statuses={report['statuses']}")
+    print(f"wall time: {report['wall_seconds']:.2f}s   throughput: {report['jobs_per_second']:.2f} jobs/s")
+    print(f"peak RSS: {report['peak_rss_mb']:.1f} MB" +
+          (f"   peak traced Python memory: {report['peak_traced_mb']:.1f} MB" if report.get("peak_traced_mb") is not None else ""))
+    print(f"\n{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in sorted(report["stages"].items()):
+        print(f"{stage:<22}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    print(f"\nLLM calls: {report['llm_calls']}")
+    print(f"Provider requests: {report['provider_requests']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sourcing pipeline offline against recorded fixtures.")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="JSONL capture of jobs and provider responses.")
+    parser.add_argument("--mode", choices=["pipeline", "api", "batch"], default="pipeline",
+                        help="Run jobs directly (pipeline), submit and read them through the FastAPI endpoints (api), "
+                             "or run them as batches of --concurrency roles (batch).")
+    parser.add_argument("--jobs", type=int, default=10, help="Number of jobs to run.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Number of jobs in flight at once.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="Mean latency of a fake LLM call.")
+    parser.add_argument("--http-latency-ms", type=float, default=50, help="Mean latency of a stub provider request.")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="Share of provider requests answered with a 429.")
+    parser.add_argument("--page-limit", type=int, default=50, help="Page size used when reading results in api mode.")
+    parser.add_argument("--mongo-url", help="Use this (local, disposable) mongod instead of mongomock.")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM/search caches and profile reuse.")
+    parser.add_argument("--provider-rate-limits", action="store_true", help="Keep the configured provider rate limits.")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own log output.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report peak traced Python memory (slower).")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    parser.add_argument("--baseline", help="A previous --output report to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail if throughput or a stage's p50/p95 is this much worse than the baseline.")
+    args = parser.parse_args()
+
+    fixtures = Fixtures.load(args.fixtures)
+    stub = StubProviderServer(fixtures, args.http_latency_ms / 1000, args.http_error_rate).start()
+    configure_environment(args, stub)
+
+    from utils.logging_setup import configure_logging
+    configure_logging(level="INFO" if args.verbose else "WARNING", log_format="text")
+
+    timer = StageTimer()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        services, llm = build_services(args, fixtures, timer)
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        started = time.perf_counter()
+        try:
+            run_jobs = {"api": run_api_jobs, "batch": run_batch_jobs}.get(args.mode, run_pipeline_jobs)
+            statuses = run_jobs(args, fixtures, services, timer)
+        finally:
+            stub.stop()
+        wall_seconds = time.perf_counter() - started
+
+    report = {
+        "mode": args.mode,
+        "jobs": args.jobs,
+        "concurrency": args.concurrency,
+        "statuses": {status: statuses.count(status) for status in sorted(set(statuses))},
+        "wall_seconds": wall_seconds,
+        "jobs_per_second": args.jobs / wall_seconds if wall_seconds else 0.0,
+        # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "peak_traced_mb": tracemalloc.get_traced_memory()[1] / (1024 * 1024) if args.tracemalloc else None,
+        "stages": timer.summary(),
+        "llm_calls": dict(llm.calls),
+        "provider_requests": dict(stub.requests)
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f), args.max_regression)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/stub_server.py
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.fixtures import Fixtures
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    """Serves recorded Serper and GitHub responses; see StubProviderServer."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate(self) -> bool:
+        """Applies the configured latency; returns False after sending a simulated 429."""
+        stub = self.server.stub
+        stub.count(self.path)
+        if stub.latency_seconds:
+            time.sleep(random.uniform(0.5, 1.5) * stub.latency_seconds)
+        if stub.error_rate and random.random() < stub.error_rate:
+            self._send(429, {"message": "rate limited (simulated)"}, {"Retry-After": "0"})
+            return False
+        return True
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if not self._simulate():
+            return
+        fixtures = self.server.stub.fixtures
+        url = urlparse(self.path)
+        if url.path == "/search/users":
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            recorded = _page(fixtures.github_search_pages, page, {"total_count": 0, "items": []})
+            items = [dict(item, url=f"{self.server.stub.base_url}/users/{item['login']}") for item in recorded.get("items", [])]
+            self._send(200, dict(recorded, items=items))
+        elif url.path.startswith("/users/"):
+            user = fixtures.github_users.get(url.path[len("/users/"):])
+            self._send(200, user) if user else self._send(404, {"message": "Not Found"})
+        else:
+            self._send(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        if not self._simulate():
+            return
+        fixtures = self.server.stub.fixtures
+        body = self._read_json()
+        path = urlparse(self.path).path
+        if path == "/search":
+            self._send(200, _page(fixtures.serper_pages, int(body.get("page", 1)), {"organic": []}))
+        elif path == "/graphql":
+            users = self.server.stub.users_by_node_id
+            ids = (body.get("variables") or {}).get("ids") or []
+            nodes = [
+                {"id": node_id, "login": users[node_id]["login"], "name": users[node_id].get("name"), "bio": users[node_id].get("bio")}
+                if node_id in users else None
+                for node_id in ids
+            ]
+            self._send(200, {"data": {"nodes": nodes}})
+        else:
+            self._send(404, {"message": "Not Found"})
+
+def _page(pages: list, page: int, empty: dict) -> dict:
+    return pages[page - 1] if 1 <= page <= len(pages) else empty
+
+class StubProviderServer:
+    """
+    A local stand-in for Serper (POST /search) and the GitHub REST and GraphQL APIs
+    (GET /search/users, GET /users/<login>, POST /graphql) that replays recorded
+    fixtures. Every request waits around `latency_seconds`, and a share of them
+    (`error_rate`) is answered with a 429 so the retry path is exercised too.
+    """
+
+    def __init__(self, fixtures: Fixtures, latency_seconds: float = 0.0, error_rate: float = 0.0):
+        self.fixtures = fixtures
+        self.users_by_node_id = fixtures.users_by_node_id()
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ProviderHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def count(self, path: str):
+        endpoint = urlparse(path).path
+        endpoint = "/users/*" if endpoint.startswith("/users/") else endpoint
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def start(self) -> "StubProviderServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -9,4 +9,136 @@ if not SERPER_API_KEY:
     raise ValueError("SERPER_API_KEY not found in .env file. Please add it.")
 
 if not GITHUB_ACCESS_TOKEN:
-    raise ValueError("GITHUB_ACCESS_TOKEN not found in .env file. Please add it.")
\ No newline at end of file
+    raise ValueError("GITHUB_ACCESS_TOKEN not found in .env file. Please add it.")
+
+# Upper bound on concurrent Groq scoring calls made by the ProfileRanker.
+# Keep this below the provider's requests-per-minute allowance.
+RANKER_MAX_CONCURRENCY = int(os.getenv("RANKER_MAX_CONCURRENCY", "5"))
+
+# Serper and GitHub endpoints are configurable so the miner can be pointed at a
+# local stub server (or a GitHub Enterprise host) without touching the agents.
+SERPER_SEARCH_URL = os.getenv("SERPER_SEARCH_URL", "https://google.serper.dev/search")
+GITHUB_API_BASE_URL = os.getenv("GITHUB_API_BASE_URL", "https://api.github.com").rstrip("/")
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", f"{GITHUB_API_BASE_URL}/graphql")
+
+# Number of parallel REST calls used to enrich GitHub users when the bulk
+# GraphQL lookup is unavailable or misses some users.
+GITHUB_ENRICH_MAX_WORKERS = int(os.getenv("GITHUB_ENRICH_MAX_WORKERS", "8"))
+
+# Job queue: how long a worker's claim on a job lasts before another worker may
+# take it over, how many times a job is attempted, and the base retry delay
+# (doubled on every further attempt).
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+WORKER_POLL_INTERVAL_SECONDS = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2"))
+
+# Size of the shared HTTP connection pool created once per process (utils/services.py)
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+
+# LLM response cache (utils/cache.py). Tiers are looked up in order; use "" to
+# disable caching, "memory" for a per-process LRU, or "memory,mongo" to also share
+# responses across processes.
+LLM_CACHE_TIERS = os.getenv("LLM_CACHE_TIERS", "memory,mongo")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# Raw search responses (Serper, GitHub) are cached by final query string, and
+# enriched profiles are reused across jobs for PROFILE_STORE_MAX_AGE_SECONDS.
+SEARCH_CACHE_TIERS = os.getenv("SEARCH_CACHE_TIERS", "memory,mongo")
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+PROFILE_STORE_MAX_AGE_SECONDS = int(os.getenv("PROFILE_STORE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# PipelineManager buffers ranked candidates and writes them in bulk once this
+# many are pending (and again when the campaign finishes).
+PIPELINE_FLUSH_SIZE = int(os.getenv("PIPELINE_FLUSH_SIZE", "100"))
+
+# Job progress events (utils/events.py): how long they are kept and how often the
+# streaming endpoint polls for new ones.
+JOB_EVENTS_RETENTION_SECONDS = int(os.getenv("JOB_EVENTS_RETENTION_SECONDS", str(24 * 3600)))
+EVENT_STREAM_POLL_SECONDS = float(os.getenv("EVENT_STREAM_POLL_SECONDS", "1"))
+
+# Cheap TF-IDF pre-filter ahead of LLM scoring (utils/relevance.py). Only the
+# PREFILTER_TOP_K most similar profiles (0 = no limit) whose similarity to the
+# job prompt is at least PREFILTER_MIN_SIMILARITY are sent to the LLM. The cap is
+# per campaign: each page scores its share of what is left, and once mining stops
+# the rest goes to the best profiles held back (agents/profile_ranker.py). The
+# default floor only drops profiles that share no term with the prompt or its
+# spec (e.g. a GitHub user without a bio), which the LLM could not judge anyway.
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", "25"))
+PREFILTER_MIN_SIMILARITY = float(os.getenv("PREFILTER_MIN_SIMILARITY", "0.05"))
+
+# Deep mining (DataMiner.iter_profile_pages): results per page, how many pages a
+# campaign may fetch, how many fetched pages may wait ahead of ranking, and the
+# default number of candidates scoring at least HIGH_SCORE_THRESHOLD after which
+# a campaign stops mining early. Jobs can override the target per request.
+MINER_PAGE_SIZE = int(os.getenv("MINER_PAGE_SIZE", "10"))
+MINER_MAX_PAGES = int(os.getenv("MINER_MAX_PAGES", "3"))
+MINER_PREFETCH_PAGES = int(os.getenv("MINER_PREFETCH_PAGES", "1"))
+MINER_TARGET_CANDIDATES = int(os.getenv("MINER_TARGET_CANDIDATES", "10"))
+HIGH_SCORE_THRESHOLD = int(os.getenv("HIGH_SCORE_THRESHOLD", "70"))
+
+# Provider rate limits (utils/rate_limit.py), per process: sustained requests per
+# second and burst size. Retries honor Retry-After / X-RateLimit-Reset and
+# otherwise back off exponentially with jitter.
+SERPER_RATE_PER_SECOND = float(os.getenv("SERPER_RATE_PER_SECOND", "5"))
+GITHUB_SEARCH_RATE_PER_SECOND = float(os.getenv("GITHUB_SEARCH_RATE_PER_SECOND", "0.5"))
+GITHUB_RATE_PER_SECOND = float(os.getenv("GITHUB_RATE_PER_SECOND", "10"))
+GROQ_RATE_PER_SECOND = float(os.getenv("GROQ_RATE_PER_SECOND", "0.5"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "4"))
+PROVIDER_BACKOFF_BASE_SECONDS = float(os.getenv("PROVIDER_BACKOFF_BASE_SECONDS", "1"))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.getenv("PROVIDER_BACKOFF_MAX_SECONDS", "60"))
+
+# Per-job call budgets for each paid provider (retries count too); 0 = unlimited
+JOB_BUDGET_SERPER_CALLS = int(os.getenv("JOB_BUDGET_SERPER_CALLS", "20"))
+JOB_BUDGET_GITHUB_CALLS = int(os.getenv("JOB_BUDGET_GITHUB_CALLS", "200"))
+JOB_BUDGET_GROQ_CALLS = int(os.getenv("JOB_BUDGET_GROQ_CALLS", "300"))
+
+# Logging (utils/logging_setup.py): level, and "json" (one object per line) or "text"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Batch submissions (POST /sourcing-jobs/batch): most roles per batch, and how many
+# distinct searches a batch mines at the same time
+BATCH_MAX_ROLES = int(os.getenv("BATCH_MAX_ROLES", "50"))
+BATCH_MAX_CONCURRENT_SEARCHES = int(os.getenv("BATCH_MAX_CONCURRENT_SEARCHES", "4"))
+
+# Retention (utils/retention.py): finished jobs and their candidates expire
+# JOB_RETENTION_SECONDS after the job finishes (0 = keep forever). Between jobs,
+# each worker purges up to RETENTION_PURGE_MAX_JOBS expired and deleted jobs every
+# RETENTION_PURGE_INTERVAL_SECONDS, RETENTION_PURGE_LEAD_SECONDS before the TTL
+# index would, deleting RETENTION_PURGE_BATCH_SIZE documents at a time with a
+# pause in between. Expired jobs are first written to RETENTION_ARCHIVE_DIR as
+# gzipped JSONL when it is set.
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(90 * 24 * 3600)))
+RETENTION_PURGE_LEAD_SECONDS = int(os.getenv("RETENTION_PURGE_LEAD_SECONDS", str(24 * 3600)))
+RETENTION_PURGE_INTERVAL_SECONDS = float(os.getenv("RETENTION_PURGE_INTERVAL_SECONDS", "300"))
+RETENTION_PURGE_MAX_JOBS = int(os.getenv("RETENTION_PURGE_MAX_JOBS", "20"))
+RETENTION_PURGE_BATCH_SIZE = int(os.getenv("RETENTION_PURGE_BATCH_SIZE", "500"))
+RETENTION_PURGE_PAUSE_SECONDS = float(os.getenv("RETENTION_PURGE_PAUSE_SECONDS", "0.2"))
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "")
+
+# Admission control. The API answers 429 (with Retry-After) once a job would push
+# the jobs waiting in the queue over MAX_QUEUED_JOBS, or one API key's over
+# MAX_QUEUED_JOBS_PER_CLIENT. Workers claim the highest priority job first, but
+# not while MAX_RUNNING_JOBS are running, or for a key that already has
+# MAX_RUNNING_JOBS_PER_CLIENT running. 0 = no limit.
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "500"))
+MAX_QUEUED_JOBS_PER_CLIENT = int(os.getenv("MAX_QUEUED_JOBS_PER_CLIENT", "50"))
+MAX_RUNNING_JOBS = int(os.getenv("MAX_RUNNING_JOBS", "8"))
+MAX_RUNNING_JOBS_PER_CLIENT = int(os.getenv("MAX_RUNNING_JOBS_PER_CLIENT", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "30"))
+
+# API keys allowed to submit jobs, as comma-separated "key" or "key:max_priority"
+# entries (max_priority defaults to 0). The per-client caps above apply per key,
+# and a job's priority is capped at its key's max_priority. When empty, the API
+# is open: every caller counts as the same anonymous client, at priority 0, and
+# the per-client caps are off (they would otherwise cap the whole service).
+API_KEYS = {
+    key.strip(): int(max_priority or 0)
+    for key, _, max_priority in (entry.partition(":") for entry in os.getenv("API_KEYS", "").split(",") if entry.strip())
+}
+if not API_KEYS:
+    MAX_QUEUED_JOBS_PER_CLIENT = MAX_RUNNING_JOBS_PER_CLIENT = 0
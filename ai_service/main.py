@@ -1,11 +1,27 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
+import asyncio
+import hashlib
+import json
 import shortuuid
-from typing import Optional
+import time
+from typing import List, Optional
 
-from utils.database import TalentPipelineDB
-from worker import run_sourcing_task
+from utils.logging_setup import configure_logging
+from utils.metrics import registry, load_series, render_prometheus
+from utils.services import get_services, run_startup_migrations
+from utils.async_database import get_async_db
+from utils.database import FINISHED_STATUSES
+from config import (
+    EVENT_STREAM_POLL_SECONDS, BATCH_MAX_ROLES, MAX_QUEUED_JOBS, MAX_QUEUED_JOBS_PER_CLIENT,
+    MAX_RUNNING_JOBS, MAX_RUNNING_JOBS_PER_CLIENT, ADMISSION_RETRY_AFTER_SECONDS, API_KEYS
+)
+
+# Importing the app (tests, benchmarks) must not override the importer's logging setup
+configure_logging(keep_existing=True)
 
 app = FastAPI(
     title="Intelligent Sourcing Agent API",
@@ -28,77 +44,330 @@ class DeleteResponse(BaseModel):
 
 class DeleteAllResponse(BaseModel):
     deleted_jobs_count: int
-    deleted_candidates_count: int
     message: str
 
 
 class SourcingRequest(BaseModel):
     linkedin_prompt: Optional[str] = Field(None, example="Senior Golang Developer in Bangalore")
     github_prompt: Optional[str] = Field(None, example="Python developer in India with FastAPI contributions")
+    target_candidates: Optional[int] = Field(None, ge=1, le=500, description="Stop mining a campaign once this many strong matches are found")
+    priority: int = Field(0, ge=0, le=9, description="Workers claim higher priority jobs first; capped at the API key's max priority")
 
 class JobResponse(BaseModel):
     job_id: str
     status: str
     message: str
+    load: Optional[dict] = None
+
+class BatchSourcingRequest(BaseModel):
+    roles: List[SourcingRequest] = Field(..., description="One entry per role; each becomes its own sourcing job")
+    priority: int = Field(0, ge=0, le=9, description="Priority of the whole batch (the roles' own priority is not used)")
+
+class BatchJobResponse(BaseModel):
+    batch_id: str
+    job_ids: List[str]
+    status: str
+    message: str
+    load: Optional[dict] = None
+
+# The handlers use the async data layer so no request blocks the event loop on Mongo.
+# The sync connection is kept for startup migrations and the queue/metrics aggregations,
+# which run in the thread pool.
+services = get_services()
+db = services.db
+job_queue = services.job_queue
+adb = get_async_db()
+
+@app.on_event("startup")
+def apply_migrations():
+    run_startup_migrations(db)
 
-db = TalentPipelineDB()
+@app.on_event("shutdown")
+def close_async_db():
+    adb.close()
+
+def _authorize(api_key: Optional[str], priority: int = 0):
+    """
+    Returns the (client_id, priority) a submission runs under. Keys must be in
+    API_KEYS, since the per-client caps would mean nothing if a caller could
+    simply send a new key, and the priority is capped at the key's max_priority.
+    Only a digest of the key is stored. Without API_KEYS every caller is the same
+    anonymous client at priority 0.
+    """
+    if not API_KEYS:
+        return "anonymous", 0
+    if api_key not in API_KEYS:
+        raise HTTPException(status_code=401, detail="A valid X-API-Key header is required.")
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16], min(priority, API_KEYS[api_key])
+
+async def _get_owned_job(job_id: str, client_id: str) -> dict:
+    """
+    Returns a job the caller may see. Jobs belong to the API key that submitted
+    them, and another key's job is reported as not found. In open mode (no
+    API_KEYS) every job belongs to the anonymous client.
+    """
+    job = await adb.get_job(job_id)
+    if not job or (API_KEYS and job.get("client_id") != client_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def _load(client_id: str = None) -> dict:
+    load = await adb.get_load(client_id)
+    load["limits"] = {
+        "max_queued": MAX_QUEUED_JOBS, "max_queued_per_client": MAX_QUEUED_JOBS_PER_CLIENT,
+        "max_running": MAX_RUNNING_JOBS, "max_running_per_client": MAX_RUNNING_JOBS_PER_CLIENT
+    }
+    return load
+
+async def _admit(client_id: str, new_jobs: int = 1) -> dict:
+    """
+    Rejects a submission with 429 and a Retry-After hint when queueing `new_jobs`
+    more jobs would exceed the global or the client's queue cap, so an overloaded
+    service pushes back before any provider is called. Returns the current load.
+    """
+    load = await _load(client_id)
+    if MAX_QUEUED_JOBS and load["queued"] + new_jobs > MAX_QUEUED_JOBS:
+        scope, detail = "global", f"The job queue is full ({load['queued']} of {MAX_QUEUED_JOBS} jobs waiting)."
+    elif MAX_QUEUED_JOBS_PER_CLIENT and load["client_queued"] + new_jobs > MAX_QUEUED_JOBS_PER_CLIENT:
+        scope, detail = "client", f"This API key already has {load['client_queued']} of {MAX_QUEUED_JOBS_PER_CLIENT} jobs waiting."
+    else:
+        return load
+    registry.inc("scoutly_admission_rejected_total", scope=scope)
+    raise HTTPException(
+        status_code=429, detail=f"{detail} Please retry later.",
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)}
+    )
 
 @app.post("/sourcing-jobs", status_code=202, response_model=JobResponse)
-async def create_sourcing_job(request: SourcingRequest, background_tasks: BackgroundTasks):
+async def create_sourcing_job(request: SourcingRequest, x_api_key: Optional[str] = Header(None)):
     if not request.linkedin_prompt and not request.github_prompt:
         raise HTTPException(status_code=400, detail="At least one prompt (linkedin_prompt or github_prompt) must be provided.")
 
+    client_id, priority = _authorize(x_api_key, request.priority)
+    load = await _admit(client_id)
     job_id = shortuuid.uuid()
-    db.create_job(job_id, request.linkedin_prompt, request.github_prompt)
-    
-    background_tasks.add_task(run_sourcing_task, job_id, request.linkedin_prompt, request.github_prompt)
+    # Creating the job document is what enqueues it; a worker process (worker.py) claims it from there.
+    await adb.create_job(
+        job_id, request.linkedin_prompt, request.github_prompt, request.target_candidates, client_id, priority
+    )
     
     return {
         "job_id": job_id,
         "status": "pending",
-        "message": "Sourcing job has been successfully created and is running in the background."
+        "message": "Sourcing job has been successfully created and queued for a worker.",
+        "load": load
+    }
+
+@app.post("/sourcing-jobs/batch", status_code=202, response_model=BatchJobResponse)
+async def create_sourcing_batch(request: BatchSourcingRequest, x_api_key: Optional[str] = Header(None)):
+    """
+    Submits many roles at once. Each role gets its own job (job_ids, in request
+    order) with its own status, events and results, but a single worker runs the
+    batch: searches that several roles would make are mined once and each profile
+    is scored against every role that found it in one batched LLM pass.
+    """
+    if not request.roles or len(request.roles) > BATCH_MAX_ROLES:
+        raise HTTPException(status_code=400, detail=f"A batch must contain between 1 and {BATCH_MAX_ROLES} roles.")
+    for index, role in enumerate(request.roles):
+        if not role.linkedin_prompt and not role.github_prompt:
+            raise HTTPException(status_code=400, detail=f"Role {index} needs at least one prompt (linkedin_prompt or github_prompt).")
+
+    client_id, priority = _authorize(x_api_key, request.priority)
+    load = await _admit(client_id, len(request.roles))
+    batch_id = shortuuid.uuid()
+    job_ids = await adb.create_batch(batch_id, [role.model_dump() for role in request.roles], client_id, priority)
+    return {
+        "batch_id": batch_id,
+        "job_ids": job_ids,
+        "status": "pending",
+        "message": "Batch has been created and queued for a worker; track each role through its job_id.",
+        "load": load
     }
 
+@app.get("/queue/stats")
+async def get_queue_stats():
+    """Reports queue depth and how long jobs wait before a worker claims them."""
+    return await run_in_threadpool(job_queue.stats)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Cache hit/miss counters aggregated across all worker processes."""
+    stats = {}
+    for doc in await adb.get_cache_stats():
+        hits = doc.get("hits", {})
+        misses = doc.get("misses", 0)
+        lookups = sum(hits.values()) + misses
+        stats[doc["_id"]] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (sum(hits.values()) / lookups) if lookups else 0.0
+        }
+    return stats
+
+def _collect_metrics() -> str:
+    series = load_series(db.db['metrics']) + registry.series()
+    for doc in db.db['cache_stats'].find({}):
+        for tier, hits in doc.get("hits", {}).items():
+            series.append({"name": "scoutly_cache_hits_total", "labels": {"cache": doc["_id"], "tier": tier}, "value": hits})
+        series.append({"name": "scoutly_cache_misses_total", "labels": {"cache": doc["_id"]}, "value": doc.get("misses", 0)})
+    queue = job_queue.stats()
+    for state in ("depth", "ready", "running"):
+        series.append({"name": "scoutly_queue_jobs", "labels": {"state": state}, "value": queue.get(state) or 0})
+    series.append({"name": "scoutly_queue_oldest_pending_age_seconds", "labels": {}, "value": queue.get("oldest_pending_age_seconds") or 0})
+    return render_prometheus(series)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: stage duration histograms, LLM token/call counters, provider
+    requests and retries, candidate writes, cache hits and queue depth, aggregated
+    across every worker process (workers flush theirs after each job).
+    """
+    body = await run_in_threadpool(_collect_metrics)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 @app.get("/sourcing-jobs/{job_id}")
-async def get_job_status(job_id: str):
-    job = db.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+async def get_job_status(job_id: str, x_api_key: Optional[str] = Header(None)):
+    client_id, _ = _authorize(x_api_key)
+    job = await _get_owned_job(job_id, client_id)
+    # Current load, so clients can tell a stuck job from a busy service
+    job["load"] = await _load(job.get("client_id"))
+    # Candidates stored with score_failed; a refresh scores them again
+    job["profiles_unscored"] = sum(c.get("profiles_unscored", 0) for c in job.get("campaigns", {}).values())
+    if job["status"] == "pending" and not job.get("batch_id"):
+        job["load"]["queue_position"] = await adb.get_queue_position(job)
     return job
 
+def _format_sse(event: dict) -> str:
+    payload = json.dumps({"seq": event["seq"], **event.get("data", {})}, default=str)
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {payload}\n\n"
+
+@app.get("/sourcing-jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Only stream events after this sequence number"),
+    last_event_id: Optional[int] = Header(None),
+    x_api_key: Optional[str] = Header(None)
+):
+    """
+    Streams a job's progress as Server-Sent Events: stage transitions (query built,
+    profiles mined, candidates stored) and every candidate as soon as it is scored.
+    Reconnecting clients resume from the Last-Event-ID header. The stream closes
+    once the job has finished and every event has been sent.
+    """
+    client_id, _ = _authorize(x_api_key)
+    await _get_owned_job(job_id, client_id)
+
+    start_seq = last_event_id if last_event_id is not None else after
+
+    async def event_stream():
+        last_seq = start_seq
+        last_sent = time.monotonic()
+        while True:
+            events = await adb.get_events_after(job_id, last_seq)
+            for event in events:
+                last_seq = event["seq"]
+                yield _format_sse(event)
+            if events:
+                last_sent = time.monotonic()
+                continue
+
+            job = await adb.get_job(job_id)
+            # A failed job that still holds a worker lease may be about to be retried
+            if not job or (job["status"] in FINISHED_STATUSES and not job.get("worker_id")):
+                for event in await adb.get_events_after(job_id, last_seq):
+                    last_seq = event["seq"]
+                    yield _format_sse(event)
+                yield f"event: end\ndata: {json.dumps({'status': job['status'] if job else 'deleted'})}\n\n"
+                return
+
+            if time.monotonic() - last_sent > 15:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(EVENT_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/sourcing-jobs/{job_id}/results")
-async def get_job_results(job_id: str):
-    job = db.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    if job['status'] != 'completed':
+async def get_job_results(
+    job_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated candidate fields to return, e.g. name,link"),
+    x_api_key: Optional[str] = Header(None)
+):
+    client_id, _ = _authorize(x_api_key)
+    job = await _get_owned_job(job_id, client_id)
+    # Partially completed jobs still have results for the campaigns that succeeded
+    if job['status'] not in ('completed', 'partially_completed'):
         raise HTTPException(status_code=400, detail=f"Job is not yet complete. Current status: {job['status']}")
-        
-    results = db.get_candidates_by_job_id(job_id)
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        results, next_cursor = await adb.get_candidates_page(job_id, limit, cursor, min_score, field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "job_id": job_id,
         "job_details": job,
         "candidate_count": len(results),
-        "candidates": results
+        "candidates": results,
+        "next_cursor": next_cursor
+    }
+
+@app.post("/sourcing-jobs/{job_id}/refresh", status_code=202, response_model=JobResponse)
+async def refresh_sourcing_job(job_id: str, x_api_key: Optional[str] = Header(None)):
+    """
+    Re-runs a finished job incrementally. The stored job spec is reused, each
+    campaign searches again from the first result page, and candidates the job
+    already has are only scored again if their profile text changed, or if the
+    last run could not score them (`score_failed`).
+    """
+    client_id, _ = _authorize(x_api_key)
+    job = await _get_owned_job(job_id, client_id)
+    if job.get("kind") == "batch":
+        raise HTTPException(status_code=400, detail="Refresh the batch's jobs (job_ids) individually.")
+    if job["status"] not in FINISHED_STATUSES or job.get("worker_id"):
+        raise HTTPException(status_code=409, detail=f"Only finished jobs can be refreshed. Current status: {job['status']}")
+    load = await _admit(client_id)
+    if not await adb.request_refresh(job):
+        raise HTTPException(status_code=409, detail="The job is already being refreshed.")
+
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "message": "Refresh has been queued for a worker.",
+        "load": load
     }
 
 @app.get("/sourcing-jobs")
-async def list_all_jobs():
-    jobs = db.get_all_jobs()
-    return {"jobs": jobs}
+async def list_all_jobs(
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    try:
+        jobs, next_cursor = await adb.get_jobs_page(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"jobs": jobs, "next_cursor": next_cursor}
 
 
 @app.delete("/sourcing-jobs/{job_id}", response_model=DeleteResponse)
-async def delete_sourcing_job(job_id: str):
+async def delete_sourcing_job(job_id: str, x_api_key: Optional[str] = Header(None)):
     """
-    Deletes a specific sourcing job and all of its associated candidates.
+    Deletes a specific sourcing job. It disappears immediately; a worker purges it
+    and its candidates in small batches in the background.
     """
-    # First, verify the job exists to provide a clear 404 error
-    job = db.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+    # First, verify the caller's job exists to provide a clear 404 error
+    client_id, _ = _authorize(x_api_key)
+    await _get_owned_job(job_id, client_id)
         
-    was_deleted = db.delete_job(job_id)
+    was_deleted = await adb.delete_job(job_id)
     if not was_deleted:
         # This case is unlikely if the above check passes, but it's good practice
         raise HTTPException(status_code=500, detail="Failed to delete the job.")
@@ -106,19 +375,20 @@ async def delete_sourcing_job(job_id: str):
     return {
         "job_id": job_id,
         "acknowledged": True,
-        "message": f"Job '{job_id}' and all its candidates have been successfully deleted."
+        "message": f"Job '{job_id}' has been deleted; its candidates are being removed in the background."
     }
 
 @app.delete("/sourcing-jobs", response_model=DeleteAllResponse)
-async def delete_all_sourcing_jobs():
+async def delete_all_sourcing_jobs(x_api_key: Optional[str] = Header(None)):
     """
-    Deletes ALL sourcing jobs and ALL candidates. Use with caution.
+    Deletes ALL of the API key's sourcing jobs and their candidates (purged in the
+    background); in open mode that is every job. Use with caution.
     """
-    result = db.delete_all_jobs()
+    client_id, _ = _authorize(x_api_key)
+    result = await adb.delete_all_jobs(client_id if API_KEYS else None)
     return {
         "deleted_jobs_count": result["deleted_jobs_count"],
-        "deleted_candidates_count": result["deleted_candidates_count"],
-        "message": "All jobs and candidates have been cleared from the database."
+        "message": "All jobs have been deleted; their candidates are being removed in the background."
     }
 
 @app.get("/")
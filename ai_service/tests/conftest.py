@@ -0,0 +1,12 @@
+# tests/conftest.py
+import os
+import sys
+
+# The service modules import as top-level packages from ai_service/, and config.py
+# refuses to load without provider keys; the tests only ever talk to local stubs.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SERPER_API_KEY", "test")
+os.environ.setdefault("GITHUB_ACCESS_TOKEN", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
+# Open mode (no API keys) unless a test configures its own
+os.environ["API_KEYS"] = ""
@@ -0,0 +1,51 @@
+# tests/test_data_miner.py
+import pytest
+
+from agents.data_miner import DataMiner
+from benchmarks.fixtures import Fixtures
+from benchmarks.stub_server import StubProviderServer
+
+QUERY = "python location:India followers:>10 repos:>5"
+
+RECORDS = [
+    {"kind": "job", "linkedin_prompt": None, "github_prompt": "Python developer in India"},
+    {"kind": "github_search", "response": {"total_count": 3, "items": [
+        {"login": "gql-user", "node_id": "N_GQL", "html_url": "https://github.com/gql-user"},
+        {"login": "rest-user", "node_id": "N_REST", "html_url": "https://github.com/rest-user"},
+        {"login": "gone-user", "node_id": "N_GONE", "html_url": "https://github.com/gone-user"},
+    ]}},
+    {"kind": "github_user", "login": "gql-user", "node_id": "N_GQL", "response": {"name": "Graph Q. User", "bio": "FastAPI maintainer"}},
+    {"kind": "github_user", "login": "rest-user", "node_id": "N_REST", "response": {"name": "Rest User", "bio": "Django and Celery"}},
+]
+
+@pytest.fixture
+def stub():
+    server = StubProviderServer(Fixtures(RECORDS)).start()
+    # GraphQL misses rest-user (REST still knows it); gone-user is unknown to both
+    del server.users_by_node_id["N_REST"]
+    yield server
+    server.stop()
+
+@pytest.fixture
+def miner(stub):
+    miner = DataMiner(api_key="test")
+    miner.github_api_url = f"{stub.base_url}/search/users"
+    miner.github_graphql_url = f"{stub.base_url}/graphql"
+    return miner
+
+def test_enrichment_falls_back_to_rest_and_keeps_unresolved_users(stub, miner):
+    profiles = miner.search_for_profiles(QUERY, "github")
+
+    assert [(p["link"], p["name"], p["snippet"]) for p in profiles] == [
+        ("https://github.com/gql-user", "Graph Q. User", "FastAPI maintainer"),
+        ("https://github.com/rest-user", "Rest User", "Django and Celery"),
+        ("https://github.com/gone-user", "gone-user", "No bio provided."),
+    ]
+    # One bulk lookup for all three, then REST only for the two it missed
+    assert stub.requests == {"/search/users": 1, "/graphql": 1, "/users/*": 2}
+
+def test_skipped_users_are_not_looked_up_one_by_one(stub, miner):
+    pages = list(miner.iter_profile_pages(QUERY, "github", max_pages=1, skip_links={"https://github.com/rest-user": "hash"}))
+
+    assert [p["link"] for p in pages[0]] == ["https://github.com/gql-user", "https://github.com/gone-user"]
+    assert stub.requests == {"/search/users": 1, "/graphql": 1, "/users/*": 1}
@@ -0,0 +1,38 @@
+# tests/test_job_queue.py
+import datetime
+import mongomock
+
+from config import MAX_RUNNING_JOBS
+from utils.database import TalentPipelineDB
+from utils.job_queue import JobQueue
+
+def test_open_mode_runs_up_to_the_global_cap():
+    db = TalentPipelineDB(mongomock.MongoClient())
+    for index in range(MAX_RUNNING_JOBS + 2):
+        db.create_job(f"job-{index}", None, "Python developer", client_id="anonymous")
+    queue = JobQueue(db)
+
+    claimed = [queue.claim(f"worker-{index}") for index in range(MAX_RUNNING_JOBS + 2)]
+
+    # Every caller is the same anonymous client, so a per-client cap would stop this at 2
+    assert sum(job is not None for job in claimed) == MAX_RUNNING_JOBS
+
+def test_stats_count_claimable_jobs_and_wait_since_ready():
+    db = TalentPipelineDB(mongomock.MongoClient())
+    db.create_batch("batch", [{"github_prompt": "Python developer"}, {"github_prompt": "Go developer"}])
+    db.create_job("deleted", None, "Python developer")
+    db.jobs_collection.update_one({"job_id": "deleted"}, {"$set": {"deleted_at": datetime.datetime.utcnow()}})
+    # A refreshed job: created long ago, queued again just now
+    db.create_job("refreshed", None, "Python developer")
+    db.jobs_collection.update_one({"job_id": "refreshed"}, {"$set": {
+        "created_at": datetime.datetime.utcnow() - datetime.timedelta(days=3), "priority": 9
+    }})
+    queue = JobQueue(db)
+
+    stats = queue.stats()
+    # The batch job and the refreshed job; not the batch members or the deleted job
+    assert (stats["depth"], stats["ready"]) == (2, 2)
+    assert stats["oldest_pending_age_seconds"] < 60
+
+    assert queue.claim("worker")["job_id"] == "refreshed"
+    assert queue.stats()["claim_latency_seconds"]["max"] < 60
@@ -0,0 +1,25 @@
+# tests/test_profile_ranker.py
+from agents.profile_ranker import ScoringShortlist
+
+def page(*similarities):
+    return [(similarity, {"link": f"p{similarity}"}) for similarity in sorted(similarities, reverse=True)]
+
+def test_shortlist_spends_the_budget_on_the_best_profiles_of_every_page():
+    shortlist = ScoringShortlist(top_k=6, pages=3)
+
+    taken = [p["link"] for p in shortlist.take(page(90, 80, 70, 60))]
+    taken += [p["link"] for p in shortlist.take(page(50, 40, 30))]
+    taken += [p["link"] for p in shortlist.take(page(95))]
+    taken += [p["link"] for p in shortlist.drain()]
+
+    # Each page takes its share (2, 2, then the 1 profile of page 3); the budget left goes to the best held back
+    assert taken == ["p90", "p80", "p50", "p40", "p95", "p70"]
+    assert shortlist.remaining == 0
+    assert shortlist.drain() == []
+
+def test_unlimited_shortlist_takes_everything():
+    shortlist = ScoringShortlist(top_k=0, pages=3)
+
+    assert len(shortlist.take(page(3, 2, 1))) == 3
+    assert shortlist.remaining is None
+    assert shortlist.drain() == []
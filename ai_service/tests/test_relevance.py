@@ -0,0 +1,11 @@
+# tests/test_relevance.py
+from utils.relevance import select_relevant
+
+def test_role_nouns_count_towards_similarity():
+    documents = ["Android engineer | Kotlin", "Android product manager", "Marketing lead"]
+
+    keep = select_relevant("Android developer", documents, top_k=0, min_similarity=0.05)
+
+    # "engineer" matches "developer"; a profile sharing no term with the prompt is dropped
+    assert [index for index, _ in keep] == [0, 1]
+    assert keep[0][1] > keep[1][1]
@@ -0,0 +1,128 @@
+# utils/async_database.py
+import threading
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+
+from utils.database import (
+    MONGO_DB_ATLAS_URL, MONGO_MAX_POOL_SIZE, DB_NAME, CANDIDATES_SORT, JOBS_SORT,
+    new_job_document, new_batch_documents, refresh_job_update, refresh_candidates_update, delete_jobs_update,
+    queued_jobs_query, running_jobs_query, queue_ahead_query, build_candidates_query, candidates_page, build_jobs_query, jobs_page
+)
+from utils.events import events_after_query
+
+class AsyncTalentPipelineDB:
+    """
+    Non-blocking counterpart of TalentPipelineDB for the FastAPI handlers, so a slow
+    query only delays its own request instead of the event loop. It reads and
+    writes the same collections through the same query helpers; indexes are still
+    created by the sync layer in run_startup_migrations. Workers keep using the
+    sync TalentPipelineDB.
+    """
+
+    def __init__(self, client: AsyncIOMotorClient = None):
+        if client is None and not MONGO_DB_ATLAS_URL:
+            raise ValueError("MONGO_DB_ATLAS_URL not found in .env file.")
+
+        # Connections are opened lazily on the event loop of the first request
+        self.client = client or AsyncIOMotorClient(MONGO_DB_ATLAS_URL, maxPoolSize=MONGO_MAX_POOL_SIZE)
+        self.db = self.client[DB_NAME]
+        self.jobs_collection = self.db['jobs']
+        self.candidates_collection = self.db['candidates']
+        self.events_collection = self.db['job_events']
+
+    async def create_job(self, job_id: str, linkedin_prompt: str, github_prompt: str, target_candidates: int = None,
+                         client_id: str = None, priority: int = 0) -> dict:
+        job_data = new_job_document(job_id, linkedin_prompt, github_prompt, target_candidates, client_id, priority)
+        await self.jobs_collection.insert_one(job_data)
+        job_data.pop('_id')
+        return job_data
+
+    async def create_batch(self, batch_id: str, roles: list, client_id: str = None, priority: int = 0) -> list:
+        """Creates a batch's member jobs and its batch job in one write; returns the member job ids."""
+        documents = new_batch_documents(batch_id, roles, client_id, priority)
+        await self.jobs_collection.insert_many(documents)
+        return documents[-1]["job_ids"]
+
+    async def get_load(self, client_id: str = None) -> dict:
+        """Counts of queued and running jobs, overall and (if given) for one client."""
+        load = {
+            "queued": await self.jobs_collection.count_documents(queued_jobs_query()),
+            "running": await self.jobs_collection.count_documents(running_jobs_query())
+        }
+        if client_id:
+            load["client_queued"] = await self.jobs_collection.count_documents(queued_jobs_query(client_id))
+            load["client_running"] = await self.jobs_collection.count_documents(running_jobs_query(client_id))
+        return load
+
+    async def get_queue_position(self, job: dict) -> int:
+        """1-based position of a pending job in the claim order."""
+        return await self.jobs_collection.count_documents(queue_ahead_query(job)) + 1
+
+    async def request_refresh(self, job: dict) -> bool:
+        """Queues a finished job for a refresh run. Returns False if it is not finished (any more)."""
+        query, update = refresh_job_update(job)
+        result = await self.jobs_collection.update_one(query, update)
+        if not result.modified_count:
+            return False
+        await self.candidates_collection.update_many(*refresh_candidates_update(job["job_id"]))
+        return True
+
+    async def get_job(self, job_id: str):
+        return await self.jobs_collection.find_one({"job_id": job_id, "deleted_at": None}, {'_id': 0})
+
+    async def get_jobs_page(self, limit: int = 20, cursor: str = None):
+        """Returns (jobs, next_cursor) for one page of jobs, newest first."""
+        docs = await self.jobs_collection.find(build_jobs_query(cursor), {'_id': 0}).sort(JOBS_SORT).limit(limit + 1).to_list(length=None)
+        return jobs_page(docs, limit)
+
+    async def get_candidates_page(self, job_id: str, limit: int = 50, cursor: str = None,
+                                  min_score: int = None, fields: list = None):
+        """Returns (candidates, next_cursor) for one page of a job's candidates, best match first."""
+        query, projection = build_candidates_query(job_id, cursor, min_score, fields)
+        docs = await self.candidates_collection.find(query, projection).sort(CANDIDATES_SORT).limit(limit + 1).to_list(length=None)
+        return candidates_page(docs, limit)
+
+    async def get_events_after(self, job_id: str, after_seq: int = 0, limit: int = 200) -> list:
+        return await (
+            self.events_collection.find(events_after_query(job_id, after_seq), {'_id': 0})
+            .sort("seq", ASCENDING)
+            .limit(limit)
+            .to_list(length=None)
+        )
+
+    async def get_cache_stats(self) -> list:
+        return await self.db['cache_stats'].find({}).to_list(length=None)
+
+    async def delete_job(self, job_id: str) -> bool:
+        """Marks a job for deletion; it and its candidates are purged in the background."""
+        query, update = delete_jobs_update(job_id)
+        result = await self.jobs_collection.update_one(query, update)
+        return result.modified_count > 0
+
+    async def delete_all_jobs(self, client_id: str = None) -> dict:
+        """Marks every job (of `client_id`, if given) for deletion; they and their candidates are purged in the background."""
+        query, update = delete_jobs_update(client_id=client_id)
+        deleted_jobs = await self.jobs_collection.update_many(query, update)
+        # Their candidates are only counted as the purger deletes them
+        return {"deleted_jobs_count": deleted_jobs.modified_count}
+
+    def close(self):
+        self.client.close()
+
+_async_db = None
+_async_db_lock = threading.Lock()
+
+def get_async_db() -> AsyncTalentPipelineDB:
+    """Returns the API process's AsyncTalentPipelineDB, creating it on first use."""
+    global _async_db
+    if _async_db is None:
+        with _async_db_lock:
+            if _async_db is None:
+                _async_db = AsyncTalentPipelineDB()
+    return _async_db
+
+def set_async_db(async_db: AsyncTalentPipelineDB):
+    """Replaces the API process's AsyncTalentPipelineDB, e.g. with a stand-in for benchmarks."""
+    global _async_db
+    with _async_db_lock:
+        _async_db = async_db
@@ -0,0 +1,278 @@
+# utils/cache.py
+import datetime
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pymongo import UpdateOne
+
+from config import (
+    LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TIERS,
+    SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TIERS
+)
+from utils.logging_setup import get_logger
+
+logger = get_logger("cache")
+
+class MemoryTTLCache:
+    """A thread-safe, in-process LRU cache whose entries also expire after `ttl_seconds`."""
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list) -> dict:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, items: dict):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class MongoTTLCache:
+    """
+    A cache tier shared by every API and worker process. Entries carry an
+    `expires_at` date backed by a TTL index, and are also filtered on read because
+    Mongo's TTL monitor only sweeps about once a minute.
+    """
+    name = "mongo"
+
+    def __init__(self, collection, ttl_seconds: float):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    def ensure_indexes(self):
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get_many(self, keys: list) -> dict:
+        if not keys:
+            return {}
+        now = datetime.datetime.utcnow()
+        docs = self.collection.find({"_id": {"$in": list(keys)}, "expires_at": {"$gt": now}}, {"value": 1})
+        return {doc["_id"]: doc["value"] for doc in docs}
+
+    def set_many(self, items: dict):
+        if not items:
+            return
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl_seconds)
+        self.collection.bulk_write(
+            [UpdateOne({"_id": key}, {"$set": {"value": value, "expires_at": expires_at}}, upsert=True)
+             for key, value in items.items()],
+            ordered=False
+        )
+
+class TieredCache:
+    """
+    Looks keys up tier by tier (fastest first), back-filling faster tiers on a hit,
+    and keeps hit/miss counters per tier. A TieredCache without tiers never hits.
+    """
+
+    def __init__(self, tiers: list, stats_name: str):
+        self.tiers = tiers
+        self.stats_name = stats_name
+        self._stats_lock = threading.Lock()
+        self._hits = {tier.name: 0 for tier in tiers}
+        self._misses = 0
+
+    def get_many(self, keys: list) -> dict:
+        found = {}
+        remaining = list(keys)
+        for index, tier in enumerate(self.tiers):
+            if not remaining:
+                break
+            try:
+                hits = tier.get_many(remaining)
+            except Exception as e:
+                logger.warning("Cache tier lookup failed.", extra={"tier": tier.name, "error": str(e)})
+                continue
+            if hits:
+                for faster_tier in self.tiers[:index]:
+                    faster_tier.set_many(hits)
+                found.update(hits)
+                remaining = [key for key in remaining if key not in hits]
+            with self._stats_lock:
+                self._hits[tier.name] += len(hits)
+        with self._stats_lock:
+            self._misses += len(remaining)
+        return found
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: dict):
+        for tier in self.tiers:
+            try:
+                tier.set_many(items)
+            except Exception as e:
+                logger.warning("Cache tier write failed.", extra={"tier": tier.name, "error": str(e)})
+
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits = dict(self._hits)
+            misses = self._misses
+        lookups = sum(hits.values()) + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (sum(hits.values()) / lookups) if lookups else 0.0
+        }
+
+    def flush_stats(self, collection):
+        """
+        Adds this process's counters to a shared `cache_stats` document and resets
+        them, so hit rates can be read across all worker processes.
+        """
+        with self._stats_lock:
+            increments = {f"hits.{name}": count for name, count in self._hits.items() if count}
+            if self._misses:
+                increments["misses"] = self._misses
+            self._hits = {name: 0 for name in self._hits}
+            self._misses = 0
+        if increments:
+            collection.update_one({"_id": self.stats_name}, {"$inc": increments}, upsert=True)
+
+def build_tiers(tier_names: str, collection, max_entries: int, ttl_seconds: float) -> list:
+    """Builds cache tiers from a comma-separated list such as "memory,mongo"."""
+    tiers = []
+    for name in [n.strip() for n in tier_names.split(",") if n.strip()]:
+        if name == "memory":
+            tiers.append(MemoryTTLCache(max_entries, ttl_seconds))
+        elif name == "mongo":
+            tiers.append(MongoTTLCache(collection, ttl_seconds))
+        else:
+            raise ValueError(f"Unknown cache tier '{name}'. Use 'memory' and/or 'mongo'.")
+    return tiers
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+class LLMCache(TieredCache):
+    """
+    Content-addressed cache for structured LLM responses. The key covers the model,
+    system prompt, output schema and the whitespace/case-normalized inputs, which is
+    safe because every chain runs at temperature 0.
+    """
+
+    def __init__(self, tiers: list = None):
+        super().__init__(tiers or [], stats_name="llm")
+
+    @classmethod
+    def from_config(cls, collection):
+        return cls(build_tiers(LLM_CACHE_TIERS, collection, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS))
+
+    @staticmethod
+    def make_key(model, system_prompt: str, schema: dict, inputs: dict) -> str:
+        model_name = getattr(model, "model_name", None) or type(model).__name__
+        payload = json.dumps(
+            [model_name, system_prompt, schema, _normalize(inputs)],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def invoke(self, chain, model, system_prompt: str, schema: dict, inputs: dict):
+        """Returns the cached response for `inputs`, or invokes `chain` and caches its result."""
+        if not self.tiers:
+            return chain.invoke(inputs)
+        key = self.make_key(model, system_prompt, schema, inputs)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        result = chain.invoke(inputs)
+        if isinstance(result, dict):
+            self.set(key, result)
+        return result
+
+    def batch(self, chain, model, system_prompt: str, schema: dict, inputs: list,
+              config: dict = None, on_result=None) -> list:
+        """
+        Like chain.batch(..., return_exceptions=True), but only the inputs without a
+        cached response are sent to the model. `on_result(index, result)` is called as
+        soon as each result is available. Exceptions are returned, never cached.
+        """
+        keys = [self.make_key(model, system_prompt, schema, item) for item in inputs] if self.tiers else []
+        cached = self.get_many(list(dict.fromkeys(keys))) if self.tiers else {}
+
+        results = [None] * len(inputs)
+        pending = []
+        for i in range(len(inputs)):
+            if keys and keys[i] in cached:
+                results[i] = cached[keys[i]]
+                if on_result:
+                    on_result(i, results[i])
+            else:
+                pending.append(i)
+
+        if pending:
+            to_store = {}
+            completed = chain.batch_as_completed([inputs[i] for i in pending], config=config, return_exceptions=True)
+            for position, result in completed:
+                i = pending[position]
+                results[i] = result
+                if keys and isinstance(result, dict):
+                    to_store[keys[i]] = result
+                if on_result:
+                    on_result(i, result)
+            self.set_many(to_store)
+        return results
+
+class SearchCache(TieredCache):
+    """TTL cache for raw search API responses, keyed by provider and the final query string."""
+
+    def __init__(self, tiers: list = None):
+        super().__init__(tiers or [], stats_name="search")
+
+    @classmethod
+    def from_config(cls, collection):
+        return cls(build_tiers(SEARCH_CACHE_TIERS, collection, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS))
+
+    @staticmethod
+    def make_key(provider: str, query: str, params: dict = None) -> str:
+        payload = json.dumps([provider, query, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, provider: str, query: str, params: dict, fetch_fn):
+        """
+        Returns the cached response for this search, or calls `fetch_fn()` and caches
+        what it returns. Errors raised by `fetch_fn` propagate and are not cached.
+        """
+        if not self.tiers:
+            return fetch_fn()
+        key = self.make_key(provider, query, params)
+        cached = self.get(key)
+        if cached is not None:
+            logger.info("Reusing cached search results.", extra={"provider": provider, "query": query})
+            return cached
+        result = fetch_fn()
+        if result is not None:
+            self.set(key, result)
+        return result
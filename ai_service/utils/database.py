@@ -1,98 +1,379 @@
 # utils/database.py
 import os
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
 from dotenv import load_dotenv
+import base64
 import datetime
+import json
+
+from config import JOB_RETENTION_SECONDS
+from utils.logging_setup import get_logger
+from utils.profile_store import profile_content_hash
+
+logger = get_logger("database")
 
 load_dotenv()
 MONGO_DB_ATLAS_URL = os.getenv("MONGO_DB_ATLAS_URL")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+DB_NAME = 'talent_pipeline_db'
+
+# Final job statuses; only finished jobs can be refreshed
+FINISHED_STATUSES = ("completed", "partially_completed", "failed")
+
+# Sort orders used by the paginated listings; each is backed by an index in ensure_indexes()
+CANDIDATES_SORT = [("match_score", DESCENDING), ("_id", DESCENDING)]
+JOBS_SORT = [("created_at", DESCENDING), ("job_id", DESCENDING)]
+
+def encode_cursor(values: dict) -> str:
+    """Packs the sort key of the last returned document into an opaque page cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid pagination cursor.")
+    return values
+
+def build_candidates_query(job_id: str, cursor: str = None, min_score: int = None, fields: list = None):
+    """
+    Returns the (filter, projection) for one page of a job's candidates, ordered by
+    CANDIDATES_SORT. Pages continue strictly after the cursor's (match_score, _id),
+    so results stay stable while new candidates are being written. Candidates that
+    could not be scored (match_score null) sort last.
+    """
+    conditions = [{"job_id": job_id}]
+    if min_score is not None:
+        conditions.append({"match_score": {"$gte": min_score}})
+    if cursor:
+        after = decode_cursor(cursor)
+        try:
+            score, last_id = after["s"], ObjectId(after["id"])
+        except Exception:
+            raise ValueError("Invalid pagination cursor.")
+        after_cursor = [{"match_score": score, "_id": {"$lt": last_id}}]
+        if score is not None:
+            # $lt never matches null, so the unscored rows after the scored ones are added explicitly
+            after_cursor += [{"match_score": {"$lt": score}}, {"match_score": None}]
+        conditions.append({"$or": after_cursor})
+    query = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    projection = None
+    if fields:
+        # match_score is always returned because the next cursor is built from it
+        projection = {field: 1 for field in fields if field != "_id"}
+        projection["match_score"] = 1
+    return query, projection
+
+def candidate_hash(candidate: dict):
+    """The content hash stored with a candidate; None for one that could not be scored, so it is scored again."""
+    return None if candidate.get("score_failed") else profile_content_hash(candidate)
+
+def candidates_page(docs: list, limit: int):
+    """Splits `limit + 1` fetched candidates into the page and the cursor for the next one."""
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1]
+        next_cursor = encode_cursor({"s": last.get("match_score"), "id": str(last["_id"])})
+    for doc in docs:
+        doc.pop("_id", None)
+    return docs, next_cursor
+
+def build_jobs_query(cursor: str = None) -> dict:
+    # Deleted jobs are hidden right away; the retention purger removes them later
+    if not cursor:
+        return {"deleted_at": None}
+    after = decode_cursor(cursor)
+    try:
+        created_at = datetime.datetime.fromisoformat(after["c"])
+        job_id = after["j"]
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+    return {"deleted_at": None, "$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "job_id": {"$lt": job_id}}
+    ]}
+
+def jobs_page(docs: list, limit: int):
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1]
+        next_cursor = encode_cursor({"c": last["created_at"].isoformat(), "j": last["job_id"]})
+    return docs, next_cursor
+
+def new_job_document(job_id: str, linkedin_prompt: str, github_prompt: str, target_candidates: int = None,
+                     client_id: str = None, priority: int = 0) -> dict:
+    """Builds a new job document; shared by the sync and async data layers so both write the same schema."""
+    campaigns = {}
+    if linkedin_prompt:
+        campaigns["linkedin"] = {"status": "pending"}
+    if github_prompt:
+        campaigns["github"] = {"status": "pending"}
+
+    now = datetime.datetime.utcnow()
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "linkedin_prompt": linkedin_prompt,
+        "github_prompt": github_prompt,
+        "campaigns": campaigns,
+        "target_candidates": target_candidates,
+        # Queue bookkeeping; see utils/job_queue.py
+        "client_id": client_id,
+        "priority": priority,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "updated_at": now
+    }
+
+def new_batch_documents(batch_id: str, roles: list, client_id: str = None, priority: int = 0) -> list:
+    """
+    Builds the documents for a batch submission: one job per role, tagged with
+    `batch_id` so the queue leaves it to the batch, followed by the batch job
+    itself (`kind: "batch"`), which is what a worker claims. Each role is a dict
+    with linkedin_prompt, github_prompt and optionally target_candidates.
+    """
+    members = []
+    for index, role in enumerate(roles):
+        member = new_job_document(
+            f"{batch_id}-{index}", role.get("linkedin_prompt"), role.get("github_prompt"), role.get("target_candidates"),
+            client_id, priority
+        )
+        member["batch_id"] = batch_id
+        members.append(member)
+
+    batch = new_job_document(batch_id, None, None, client_id=client_id, priority=priority)
+    batch["kind"] = "batch"
+    batch["job_ids"] = [member["job_id"] for member in members]
+    return members + [batch]
+
+def queued_jobs_query(client_id: str = None) -> dict:
+    """Jobs waiting for a worker. Batch members count one by one; the batch job itself does not."""
+    query = {"status": "pending", "kind": {"$ne": "batch"}, "deleted_at": None}
+    if client_id:
+        query["client_id"] = client_id
+    return query
+
+def running_jobs_query(client_id: str = None) -> dict:
+    """Jobs a worker is running: single jobs and whole batches (not their members)."""
+    query = {"status": "running", "batch_id": None, "deleted_at": None}
+    if client_id:
+        query["client_id"] = client_id
+    return query
+
+def queue_ahead_query(job: dict) -> dict:
+    """Claimable jobs a worker will pick before `job` (see JobQueue.claim's sort)."""
+    priority = job.get("priority") or 0
+    return {
+        "status": "pending", "batch_id": None, "deleted_at": None,
+        "$or": [
+            {"priority": {"$gt": priority}},
+            {"priority": priority, "next_attempt_at": {"$lt": job["next_attempt_at"]}}
+        ]
+    }
+
+def refresh_job_update(job: dict):
+    """
+    Returns the (filter, update) that puts a finished job back in the queue as a
+    refresh: its campaigns mine again from the first result page, reuse the
+    stored job specs and only score profiles that are new or changed. The filter
+    only matches while the job is finished and not held by a worker, so
+    concurrent refresh requests queue it once. A refreshed batch member is run on
+    its own from then on. The job no longer expires; refresh_candidates_update
+    does the same for its candidates.
+    """
+    now = datetime.datetime.utcnow()
+    update = {
+        "$set": {
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "refresh_requested_at": now,
+            "updated_at": now,
+            **{f"campaigns.{platform}.status": "pending" for platform in job.get("campaigns", {})}
+        },
+        "$unset": {"batch_id": "", "last_error": "", "expires_at": ""},
+        "$inc": {"refresh_count": 1}
+    }
+    query = {
+        "job_id": job["job_id"], "status": {"$in": list(FINISHED_STATUSES)},
+        "worker_id": {"$exists": False}, "deleted_at": None
+    }
+    return query, update
+
+def refresh_candidates_update(job_id: str):
+    """Returns the (filter, update) that stops a refreshed job's candidates from expiring until it finishes again."""
+    return {"job_id": job_id, "expires_at": {"$exists": True}}, {"$unset": {"expires_at": ""}}
+
+def delete_jobs_update(job_id: str = None, client_id: str = None):
+    """
+    Returns the (filter, update) that marks one job (or every job, optionally of
+    one client) as deleted. The job disappears from the API at once, and the
+    retention purger deletes it and its candidates in small batches in the background.
+    """
+    now = datetime.datetime.utcnow()
+    query = {"deleted_at": None}
+    if job_id:
+        query["job_id"] = job_id
+    if client_id:
+        query["client_id"] = client_id
+    return query, {"$set": {"deleted_at": now, "updated_at": now}}
 
 class TalentPipelineDB:
-    def __init__(self):
-        if not MONGO_DB_ATLAS_URL:
+    def __init__(self, client: MongoClient = None):
+        if client is None and not MONGO_DB_ATLAS_URL:
             raise ValueError("MONGO_DB_ATLAS_URL not found in .env file.")
         
         try:
-            self.client = MongoClient(MONGO_DB_ATLAS_URL)
-            self.db = self.client['talent_pipeline_db']
+            # MongoClient is a thread-safe connection pool; create one per process and share it
+            self.client = client or MongoClient(MONGO_DB_ATLAS_URL, maxPoolSize=MONGO_MAX_POOL_SIZE)
+            self.db = self.client[DB_NAME]
             
             self.jobs_collection = self.db['jobs']
             self.candidates_collection = self.db['candidates']
             
-            self.candidates_collection.create_index([("link", 1), ("job_id", 1)], unique=True)
-            
-            print("Successfully connected to MongoDB Atlas.")
+            logger.info("Successfully connected to MongoDB Atlas.")
 
         except Exception as e:
-            print(f"Could not connect to MongoDB Atlas: {e}")
+            logger.error("Could not connect to MongoDB Atlas.", extra={"error": str(e)})
             raise
 
-    def create_job(self, job_id: str, linkedin_prompt: str, github_prompt: str) -> dict:
-        job_data = {
-            "job_id": job_id,
-            "status": "pending",
-            "linkedin_prompt": linkedin_prompt,
-            "github_prompt": github_prompt,
-            "created_at": datetime.datetime.utcnow(),
-            "updated_at": datetime.datetime.utcnow()
-        }
+    def ensure_indexes(self):
+        """
+        Creates the indexes the queries below (and AsyncTalentPipelineDB's) rely on.
+        Run once at startup, not per job.
+        """
+        self.candidates_collection.create_index([("link", 1), ("job_id", 1)], unique=True)
+        self.candidates_collection.create_index([("job_id", ASCENDING)] + CANDIDATES_SORT)
+        self.jobs_collection.create_index("job_id")
+        self.jobs_collection.create_index(JOBS_SORT)
+
+    def create_job(self, job_id: str, linkedin_prompt: str, github_prompt: str, target_candidates: int = None,
+                   client_id: str = None, priority: int = 0) -> dict:
+        job_data = new_job_document(job_id, linkedin_prompt, github_prompt, target_candidates, client_id, priority)
         self.jobs_collection.insert_one(job_data)
         job_data.pop('_id') 
         return job_data
 
-    def update_job_status(self, job_id: str, status: str):
+    def create_batch(self, batch_id: str, roles: list, client_id: str = None, priority: int = 0) -> list:
+        """Creates a batch's member jobs and its batch job in one write; returns the member job ids."""
+        documents = new_batch_documents(batch_id, roles, client_id, priority)
+        self.jobs_collection.insert_many(documents)
+        return documents[-1]["job_ids"]
+
+    def update_job_status(self, job_id: str, status: str, **details):
         self.jobs_collection.update_one(
             {"job_id": job_id},
-            {"$set": {"status": status, "updated_at": datetime.datetime.utcnow()}}
+            {"$set": {"status": status, "updated_at": datetime.datetime.utcnow(), **details}}
         )
 
+    def finish_job(self, job_id: str, status: str, **details):
+        """
+        Records a job's final status and, if retention is enabled, when it and its
+        candidates expire (see utils/retention.py).
+        """
+        if JOB_RETENTION_SECONDS > 0:
+            expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=JOB_RETENTION_SECONDS)
+            details["expires_at"] = expires_at
+            self.candidates_collection.update_many({"job_id": job_id}, {"$set": {"expires_at": expires_at}})
+        self.update_job_status(job_id, status, **details)
+
+    def update_campaign_status(self, job_id: str, platform: str, status: str, **details):
+        """Records the status of a single platform campaign (plus any extra details) on its job."""
+        update = {f"campaigns.{platform}.status": status, "updated_at": datetime.datetime.utcnow()}
+        for key, value in details.items():
+            update[f"campaigns.{platform}.{key}"] = value
+        self.jobs_collection.update_one({"job_id": job_id}, {"$set": update})
+
+    def save_job_specs(self, job_id: str, job_specs: dict):
+        """Stores the structured job spec extracted for each platform's prompt, for reuse by reruns."""
+        if not job_specs:
+            return
+        update = {f"job_specs.{platform}": spec for platform, spec in job_specs.items()}
+        update["updated_at"] = datetime.datetime.utcnow()
+        self.jobs_collection.update_one({"job_id": job_id}, {"$set": update})
+
     def get_job(self, job_id: str):
-        job = self.jobs_collection.find_one({"job_id": job_id}, {'_id': 0})
+        job = self.jobs_collection.find_one({"job_id": job_id, "deleted_at": None}, {'_id': 0})
         return job
 
-    def get_all_jobs(self) -> list:
-        jobs = list(self.jobs_collection.find({}, {'_id': 0}).sort("created_at", -1))
-        return jobs
+    def add_candidates(self, candidates: list, job_id: str) -> dict:
+        """
+        Stores a batch of candidates for a job in one unordered bulk write. Each
+        candidate is an upsert on (link, job_id) that only writes on insert, so
+        candidates already stored for the job are counted as duplicates, not errors.
+        """
+        if not candidates:
+            return {"inserted": 0, "duplicates": 0, "failed": 0}
+
+        operations = []
+        for candidate_data in candidates:
+            candidate_data['job_id'] = job_id
+            candidate_data['content_hash'] = candidate_hash(candidate_data)
+            operations.append(UpdateOne(
+                {"link": candidate_data.get('link'), "job_id": job_id},
+                {"$setOnInsert": candidate_data},
+                upsert=True
+            ))
 
-    def add_candidate(self, candidate_data: dict, job_id: str):
-        candidate_data['job_id'] = job_id
         try:
-            self.candidates_collection.insert_one(candidate_data)
-            print(f"  -> Added candidate to MongoDB for job {job_id}: {candidate_data.get('name')}")
-            return True
-        except DuplicateKeyError:
-            print(f"  -> Duplicate found for job {job_id}, skipping: {candidate_data.get('name')}")
-            return False
+            result = self.candidates_collection.bulk_write(operations, ordered=False)
+            inserted, duplicates, failed = result.upserted_count, result.matched_count, 0
+        except BulkWriteError as e:
+            # Two concurrent upserts of the same key can race into a duplicate key error;
+            # those are duplicates too. Anything else is a genuine failure for that row.
+            details = e.details
+            errors = details.get("writeErrors", [])
+            dup_errors = sum(1 for err in errors if err.get("code") == 11000)
+            inserted = details.get("nUpserted", 0)
+            duplicates = details.get("nMatched", 0) + dup_errors
+            failed = len(errors) - dup_errors
+            logger.warning("Candidate writes failed.", extra={"job_id": job_id, "failed": failed})
         except Exception as e:
-            print(f"  -> An error occurred while adding a candidate: {e}")
-            return False
+            logger.warning("Could not add candidates.", extra={"job_id": job_id, "error": str(e)})
+            return {"inserted": 0, "duplicates": 0, "failed": len(candidates)}
+
+        logger.info("Stored candidates.", extra={"job_id": job_id, "inserted": inserted, "duplicates": duplicates})
+        return {"inserted": inserted, "duplicates": duplicates, "failed": failed}
 
-    def get_candidates_by_job_id(self, job_id: str) -> list:
+    def update_candidates(self, candidates: list, job_id: str) -> int:
+        """Overwrites the stored rows of candidates that were (re)scored; returns how many changed."""
+        if not candidates:
+            return 0
+        operations = []
+        for candidate_data in candidates:
+            candidate_data['job_id'] = job_id
+            candidate_data['content_hash'] = candidate_hash(candidate_data)
+            update = {"$set": candidate_data}
+            if not candidate_data.get('score_failed'):
+                update["$unset"] = {"score_failed": ""}
+            operations.append(UpdateOne({"link": candidate_data.get('link'), "job_id": job_id}, update))
         try:
-            candidates = list(self.candidates_collection.find({"job_id": job_id}, {'_id': 0}))
-            candidates.sort(key=lambda p: p.get('match_score', 0), reverse=True)
-            return candidates
+            return self.candidates_collection.bulk_write(operations, ordered=False).modified_count
         except Exception as e:
-            print(f"  -> An error occurred while fetching candidates for job {job_id}: {e}")
-            return []
+            logger.warning("Could not update candidates.", extra={"job_id": job_id, "error": str(e)})
+            return 0
 
-    def delete_job(self, job_id: str) -> bool:
-        """Deletes a job and all its associated candidates."""
-        # Delete the job document
-        job_delete_result = self.jobs_collection.delete_one({"job_id": job_id})
-        
-        if job_delete_result.deleted_count > 0:
-            # If the job was found and deleted, delete its candidates
-            self.candidates_collection.delete_many({"job_id": job_id})
-            return True
-        return False
-
-    def delete_all_jobs(self) -> dict:
-        """Deletes all jobs and all candidates from the database."""
-        deleted_jobs = self.jobs_collection.delete_many({})
-        deleted_candidates = self.candidates_collection.delete_many({})
+    def get_candidate_hashes(self, job_id: str) -> dict:
+        """
+        Returns {link: content_hash} for every candidate already stored for a job, so
+        a rerun can skip profiles it has already scored. Rows stored before hashes
+        were recorded are hashed from their stored title and snippet. Candidates
+        that could not be scored have no hash, so the next run scores them again.
+        """
+        docs = self.candidates_collection.find(
+            {"job_id": job_id}, {"_id": 0, "link": 1, "content_hash": 1, "title": 1, "snippet": 1, "score_failed": 1}
+        )
         return {
-            "deleted_jobs_count": deleted_jobs.deleted_count,
-            "deleted_candidates_count": deleted_candidates.deleted_count
+            doc["link"]: None if doc.get("score_failed") else doc.get("content_hash") or profile_content_hash(doc)
+            for doc in docs if doc.get("link")
         }
@@ -0,0 +1,53 @@
+# utils/events.py
+import datetime
+import threading
+from pymongo import ASCENDING, DESCENDING
+
+from config import JOB_EVENTS_RETENTION_SECONDS
+from utils.logging_setup import get_logger
+
+logger = get_logger("events")
+
+def ensure_event_indexes(collection):
+    collection.create_index([("job_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+    collection.create_index("created_at", expireAfterSeconds=JOB_EVENTS_RETENTION_SECONDS)
+
+def events_after_query(job_id: str, after_seq: int = 0) -> dict:
+    return {"job_id": job_id, "seq": {"$gt": after_seq}}
+
+class JobEventPublisher:
+    """
+    Appends progress events for one job to the `job_events` collection, numbered
+    with a per-job sequence so streaming clients can resume after the last event
+    they saw. Workers run in separate processes from the API, so events go through
+    Mongo rather than an in-process channel.
+    """
+
+    def __init__(self, collection, job_id: str):
+        self.collection = collection
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        # A retried job continues the sequence of the attempt before it
+        try:
+            last = collection.find_one({"job_id": job_id}, {"seq": 1}, sort=[("seq", DESCENDING)])
+        except Exception as e:
+            logger.warning("Could not read the last event.", extra={"job_id": job_id, "error": str(e)})
+            last = None
+        self._seq = last["seq"] if last else 0
+
+    def publish(self, event: str, **data):
+        # Insert while holding the lock: streams read forward from the last seq
+        # they saw, so seq N+1 must never become visible before seq N
+        with self._lock:
+            self._seq += 1
+            try:
+                self.collection.insert_one({
+                    "job_id": self.job_id,
+                    "seq": self._seq,
+                    "event": event,
+                    "data": data,
+                    "created_at": datetime.datetime.utcnow()
+                })
+            except Exception as e:
+                # Progress reporting is best-effort and must never fail the job itself
+                logger.warning("Could not publish event.", extra={"job_id": self.job_id, "event": event, "error": str(e)})
@@ -0,0 +1,35 @@
+# utils/http_client.py
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_POOL_MAXSIZE
+
+def build_http_session(pool_maxsize: int = HTTP_POOL_MAXSIZE) -> requests.Session:
+    """
+    Creates a requests.Session backed by a keep-alive connection pool. Sessions are
+    thread-safe for issuing requests, so one instance can be shared by every job.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class RateLimitedClient:
+    """
+    A thin wrapper around a shared session that sends every request for one provider
+    through that provider's RateLimiter (token bucket, job budget and retries).
+    """
+
+    def __init__(self, session: requests.Session, limiter):
+        self.session = session
+        self.limiter = limiter
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.limiter.request(self.session, method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
@@ -0,0 +1,182 @@
+# utils/job_queue.py
+import datetime
+import random
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from utils.database import TalentPipelineDB
+from config import (
+    JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, MAX_RUNNING_JOBS, MAX_RUNNING_JOBS_PER_CLIENT
+)
+from utils.logging_setup import get_logger
+
+logger = get_logger("job_queue")
+
+class JobQueue:
+    """
+    A durable work queue on top of the existing `jobs` collection.
+
+    A job is claimable when it is `pending` and its `next_attempt_at` has passed, or
+    when it is `running` but the lease of the worker that claimed it has expired
+    (the worker crashed or lost connectivity). Claims are a single atomic
+    find_one_and_update, so any number of worker processes can share the queue.
+    Ready jobs are claimed highest priority first, then oldest first. No new job
+    is started while `max_running` jobs are running, and clients (API keys) that
+    already have `max_running_per_client` running are passed over. The running
+    counts are read just before the claim, so workers claiming at the same
+    moment can overshoot a cap by a job each.
+    """
+
+    def __init__(self, db_instance: TalentPipelineDB, lease_seconds: int = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, retry_base_seconds: float = JOB_RETRY_BASE_SECONDS,
+                 max_running: int = MAX_RUNNING_JOBS, max_running_per_client: int = MAX_RUNNING_JOBS_PER_CLIENT):
+        self.db = db_instance
+        self.jobs_collection = db_instance.jobs_collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.max_running = max_running
+        self.max_running_per_client = max_running_per_client
+
+    def ensure_indexes(self):
+        self.jobs_collection.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        self.jobs_collection.create_index([("status", ASCENDING), ("priority", DESCENDING), ("next_attempt_at", ASCENDING)])
+        self.jobs_collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self.jobs_collection.create_index([("client_id", ASCENDING), ("status", ASCENDING)])
+
+    def claim(self, worker_id: str):
+        """Atomically claims the next ready job for `worker_id`, or returns None."""
+        now = datetime.datetime.utcnow()
+        self._fail_exhausted_leases(now)
+
+        # Jobs submitted as part of a batch are run by their batch job, not claimed on their own
+        ready = {"status": "pending", "next_attempt_at": {"$lte": now}, "batch_id": None, "deleted_at": None}
+        if self.max_running or self.max_running_per_client:
+            running = self.running_by_client(now)
+            if self.max_running and sum(running.values()) >= self.max_running:
+                return None
+            if self.max_running_per_client:
+                saturated = [client for client, count in running.items() if count >= self.max_running_per_client]
+                if saturated:
+                    ready["client_id"] = {"$nin": saturated}
+
+        # An update pipeline, so the claim can record how long the job waited since it
+        # became claimable: its next_attempt_at, or the expiry of the lease it takes over
+        return self.jobs_collection.find_one_and_update(
+            {"$or": [
+                ready,
+                {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$lt": self.max_attempts}, "deleted_at": None}
+            ]},
+            [{"$set": {
+                "claim_wait_ms": {"$subtract": [
+                    now, {"$cond": [{"$eq": ["$status", "pending"]}, "$next_attempt_at", "$lease_expires_at"]}
+                ]},
+                "status": "running",
+                "worker_id": worker_id,
+                "claimed_at": now,
+                "lease_expires_at": now + datetime.timedelta(seconds=self.lease_seconds),
+                "updated_at": now,
+                "attempts": {"$add": [{"$ifNull": ["$attempts", 0]}, 1]}
+            }}],
+            sort=[("priority", DESCENDING), ("next_attempt_at", ASCENDING)],
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def running_by_client(self, now: datetime.datetime = None) -> dict:
+        """{client_id: number of jobs running under a live lease}."""
+        now = now or datetime.datetime.utcnow()
+        return {
+            doc["_id"]: doc["count"]
+            for doc in self.jobs_collection.aggregate([
+                {"$match": {"status": "running", "lease_expires_at": {"$gte": now}}},
+                {"$group": {"_id": "$client_id", "count": {"$sum": 1}}}
+            ])
+        }
+
+    def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        """Extends the lease on a job this worker still owns. Returns False if the lease was lost."""
+        now = datetime.datetime.utcnow()
+        result = self.jobs_collection.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"lease_expires_at": now + datetime.timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.modified_count > 0
+
+    def release(self, job: dict, worker_id: str, status: str, error: str = None):
+        """
+        Hands a finished job back to the queue. Failed jobs with attempts left are
+        rescheduled as `pending` with an exponential, jittered backoff; everything
+        else simply drops its lease and keeps the final status.
+        """
+        now = datetime.datetime.utcnow()
+        attempts = job.get("attempts", 1)
+        update = {"$unset": {"worker_id": "", "lease_expires_at": ""}, "$set": {"updated_at": now}}
+
+        if status == "failed" and attempts < self.max_attempts:
+            delay = self.retry_base_seconds * (2 ** (attempts - 1))
+            delay = delay * random.uniform(0.8, 1.2)
+            update["$set"].update({
+                "status": "pending",
+                "next_attempt_at": now + datetime.timedelta(seconds=delay),
+                "last_error": error
+            })
+            logger.warning("Job failed, retrying later.", extra={
+                "job_id": job['job_id'], "attempt": attempts, "max_attempts": self.max_attempts, "retry_in_seconds": round(delay)
+            })
+        elif error:
+            update["$set"]["last_error"] = error
+
+        self.jobs_collection.update_one({"job_id": job["job_id"], "worker_id": worker_id}, update)
+
+    def _fail_exhausted_leases(self, now: datetime.datetime):
+        # A job whose worker died on its final attempt would otherwise stay `running` forever
+        self.jobs_collection.update_many(
+            {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {"status": "failed", "last_error": "Worker lease expired on final attempt.", "updated_at": now},
+                "$unset": {"worker_id": "", "lease_expires_at": ""}
+            }
+        )
+
+    def stats(self, latency_window_seconds: int = 3600) -> dict:
+        """
+        Queue depth by status plus how long jobs have been waiting to be claimed.
+        Only jobs workers claim are counted (not batch members or deleted jobs), and
+        waits run from when a job became claimable, so a retried or refreshed job
+        does not report its whole lifetime.
+        """
+        now = datetime.datetime.utcnow()
+        claimable = {"batch_id": None, "deleted_at": None}
+        status_counts = {
+            doc["_id"]: doc["count"]
+            for doc in self.jobs_collection.aggregate([
+                {"$match": claimable},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ])
+        }
+        ready_query = {"status": "pending", "next_attempt_at": {"$lte": now}, **claimable}
+        ready = self.jobs_collection.count_documents(ready_query)
+
+        oldest = self.jobs_collection.find_one(ready_query, {"next_attempt_at": 1}, sort=[("next_attempt_at", ASCENDING)])
+        oldest_age = (now - oldest["next_attempt_at"]).total_seconds() if oldest else 0.0
+
+        since = now - datetime.timedelta(seconds=latency_window_seconds)
+        latency = list(self.jobs_collection.aggregate([
+            {"$match": {"claimed_at": {"$gte": since}, "claim_wait_ms": {"$exists": True}}},
+            {"$group": {"_id": None, "avg_ms": {"$avg": "$claim_wait_ms"}, "max_ms": {"$max": "$claim_wait_ms"}, "count": {"$sum": 1}}}
+        ]))
+        latency = latency[0] if latency else {"avg_ms": 0, "max_ms": 0, "count": 0}
+
+        return {
+            "depth": status_counts.get("pending", 0),
+            "ready": ready,
+            "running": status_counts.get("running", 0),
+            "status_counts": status_counts,
+            "oldest_pending_age_seconds": oldest_age,
+            "claim_latency_seconds": {
+                "window_seconds": latency_window_seconds,
+                "claimed": latency["count"],
+                "avg": (latency["avg_ms"] or 0) / 1000,
+                "max": (latency["max_ms"] or 0) / 1000
+            }
+        }
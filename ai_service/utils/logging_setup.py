@@ -0,0 +1,81 @@
+# utils/logging_setup.py
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import sys
+
+from config import LOG_LEVEL, LOG_FORMAT
+
+_log_context = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """
+    Adds `fields` (e.g. job_id, platform) to every log record emitted in this
+    context, including from thread pools that run tasks in a copy of it.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any structured fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with the structured fields appended."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = {k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS and not k.startswith("_")}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, keep_existing: bool = False):
+    """
+    Sets up the `scoutly` loggers once per process. Call it from the API and worker
+    entry points. With `keep_existing`, a configuration the host process already
+    installed (e.g. a benchmark or test harness importing the app) is left alone.
+    """
+    logger = logging.getLogger("scoutly")
+    if keep_existing and logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    handler.addFilter(_ContextFilter())
+    logger.handlers = [handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"scoutly.{name}")
@@ -0,0 +1,200 @@
+# utils/metrics.py
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from pymongo import UpdateOne
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+METRICS = {
+    "scoutly_stage_duration_seconds": ("histogram", "Duration of pipeline stages (job, campaign, job_spec, query_build, search, enrichment, llm_call, rank, db_write)."),
+    "scoutly_jobs_finished_total": ("counter", "Sourcing jobs finished, by final status."),
+    "scoutly_llm_calls_total": ("counter", "LLM calls sent to the provider, by outcome."),
+    "scoutly_llm_tokens_total": ("counter", "LLM tokens used, by direction (input/output)."),
+    "scoutly_provider_requests_total": ("counter", "Requests sent to external providers, including retries."),
+    "scoutly_provider_retries_total": ("counter", "Provider calls retried after a throttled or transient failure."),
+    "scoutly_provider_budget_exhausted_total": ("counter", "Provider calls refused because the job's budget was used up."),
+    "scoutly_candidates_stored_total": ("counter", "Candidate writes, by result (inserted/duplicate/updated/failed)."),
+    "scoutly_retention_purged_total": ("counter", "Documents purged by the retention purger, by collection and reason (expired/deleted)."),
+    "scoutly_cache_hits_total": ("counter", "Cache hits, by cache and tier."),
+    "scoutly_cache_misses_total": ("counter", "Cache misses, by cache."),
+    "scoutly_admission_rejected_total": ("counter", "Job submissions rejected with 429, by the cap that was hit (global/client)."),
+    "scoutly_queue_jobs": ("gauge", "Jobs in the queue, by state."),
+    "scoutly_queue_oldest_pending_age_seconds": ("gauge", "Age of the oldest job waiting to be claimed."),
+}
+
+def _series_key(name: str, labels: dict) -> str:
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process counters and histograms. Worker processes periodically
+    add theirs to a shared Mongo collection (see flush), and the API's /metrics
+    endpoint renders the combined series in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            series = self._series.setdefault(key, {"name": name, "labels": labels, "value": 0})
+            series["value"] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _series_key(name, labels)
+        with self._lock:
+            series = self._series.setdefault(key, {
+                "name": name, "labels": labels, "buckets": [0] * (len(DURATION_BUCKETS) + 1), "sum": 0.0, "count": 0
+            })
+            series["buckets"][bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def series(self, reset: bool = False) -> list:
+        with self._lock:
+            snapshot = [dict(s, buckets=list(s["buckets"])) if "buckets" in s else dict(s) for s in self._series.values()]
+            if reset:
+                self._series = {}
+        return snapshot
+
+    def flush(self, collection):
+        """Adds this process's series to the shared `metrics` collection and resets them."""
+        operations = []
+        for s in self.series(reset=True):
+            if "buckets" in s:
+                increments = {f"buckets.{i}": n for i, n in enumerate(s["buckets"]) if n}
+                increments.update({"sum": s["sum"], "count": s["count"]})
+            else:
+                increments = {"value": s["value"]}
+            operations.append(UpdateOne(
+                {"_id": _series_key(s["name"], s["labels"])},
+                {"$setOnInsert": {"name": s["name"], "labels": s["labels"]}, "$inc": increments},
+                upsert=True
+            ))
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+
+registry = MetricsRegistry()
+
+def load_series(collection) -> list:
+    """Reads the series flushed by every process, in the same shape as MetricsRegistry.series()."""
+    loaded = []
+    for doc in collection.find({}):
+        if "count" in doc:
+            buckets = doc.get("buckets") or {}
+            loaded.append({
+                "name": doc["name"], "labels": doc.get("labels") or {}, "sum": doc.get("sum", 0.0), "count": doc["count"],
+                "buckets": [buckets.get(str(i), 0) for i in range(len(DURATION_BUCKETS) + 1)]
+            })
+        else:
+            loaded.append({"name": doc["name"], "labels": doc.get("labels") or {}, "value": doc.get("value", 0)})
+    return loaded
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for k, v in labels.items()}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(escaped.items())) + "}"
+
+def render_prometheus(series: list) -> str:
+    """Renders series (summing any that share a name and labels) in the Prometheus text format."""
+    merged = {}
+    for s in series:
+        key = _series_key(s["name"], s["labels"])
+        if key not in merged:
+            merged[key] = dict(s, buckets=list(s["buckets"])) if "buckets" in s else dict(s)
+        elif "buckets" in s:
+            target = merged[key]
+            target["buckets"] = [a + b for a, b in zip(target["buckets"], s["buckets"])]
+            target["sum"] += s["sum"]
+            target["count"] += s["count"]
+        else:
+            merged[key]["value"] += s["value"]
+
+    lines = []
+    for name in sorted({s["name"] for s in merged.values()}):
+        kind, description = METRICS.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for s in sorted((s for s in merged.values() if s["name"] == name), key=lambda s: _format_labels(s["labels"])):
+            if "buckets" in s:
+                cumulative = 0
+                for bound, count in zip(list(DURATION_BUCKETS) + ["+Inf"], s["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels({**s['labels'], 'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(s['labels'])} {s['sum']}")
+                lines.append(f"{name}_count{_format_labels(s['labels'])} {s['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(s['labels'])} {s['value']}")
+    return "\n".join(lines) + "\n"
+
+class JobTimings:
+    """Per-job totals of every stage span, saved on the job document as `stage_timings`."""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            timing = self._stages.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            timing["count"] += 1
+            timing["total_seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                stage: {k: round(v, 4) if isinstance(v, float) else v for k, v in timing.items()}
+                for stage, timing in self._stages.items()
+            }
+
+_current_timings = contextvars.ContextVar("job_timings", default=None)
+
+@contextlib.contextmanager
+def job_timings(timings: JobTimings):
+    """Makes `timings` collect the spans recorded in this context (and copies of it)."""
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+@contextlib.contextmanager
+def span(stage: str):
+    """Times a pipeline stage into the duration histogram and the current job's timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe("scoutly_stage_duration_seconds", elapsed, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(stage, elapsed)
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Counts the input and output tokens reported by every chat model call."""
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens, output_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if input_tokens is None:
+            # Providers that only report usage on the message itself
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    input_tokens = (input_tokens or 0) + metadata.get("input_tokens", 0)
+                    output_tokens = (output_tokens or 0) + metadata.get("output_tokens", 0)
+        if input_tokens:
+            registry.inc("scoutly_llm_tokens_total", input_tokens, type="input")
+        if output_tokens:
+            registry.inc("scoutly_llm_tokens_total", output_tokens, type="output")
@@ -0,0 +1,55 @@
+# utils/pipeline.py
+import contextvars
+import queue
+import threading
+
+_DONE = object()
+
+def prefetch(items, buffer_size: int = 1):
+    """
+    Iterates `items` (typically a generator doing network I/O) on a background
+    thread and yields its values through a bounded queue. The producer runs at most
+    `buffer_size` items ahead of the consumer, which gives backpressure between the
+    stages, and it stops as soon as the consumer stops iterating (e.g. breaks early).
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    handoff = queue.Queue(maxsize=max(1, buffer_size))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    break
+        except Exception as e:
+            put((_DONE, e))
+            return
+        finally:
+            close = getattr(items, "close", None)
+            if close:
+                close()
+        put((_DONE, None))
+
+    # Copy the caller's context so per-job context variables apply to the producer too
+    context = contextvars.copy_context()
+    producer = threading.Thread(target=context.run, args=(produce,), daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = handoff.get()
+            if item is _DONE:
+                if error:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,63 @@
+# utils/profile_store.py
+import datetime
+import hashlib
+from pymongo import UpdateOne
+
+from config import PROFILE_STORE_MAX_AGE_SECONDS
+from utils.logging_setup import get_logger
+
+logger = get_logger("profile_store")
+
+PROFILE_FIELDS = ("name", "title", "link", "snippet", "source")
+
+def profile_content_hash(profile: dict) -> str:
+    """Fingerprint of the profile text that scoring looks at, used to rescore only profiles that changed."""
+    text = f"{profile.get('title') or ''}\n{profile.get('snippet') or ''}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ProfileStore:
+    """
+    Cross-job store of mined candidate profiles, keyed by profile `link`. Jobs still
+    get their own rows in `candidates`; this store only lets a later job skip the
+    network work (e.g. GitHub user enrichment) for profiles another job already fetched.
+    """
+
+    def __init__(self, collection, max_age_seconds: int = PROFILE_STORE_MAX_AGE_SECONDS):
+        self.collection = collection
+        self.max_age_seconds = max_age_seconds
+
+    def ensure_indexes(self):
+        self.collection.create_index("link", unique=True)
+
+    def get_many(self, links: list) -> dict:
+        """Returns {link: profile} for the links stored recently enough to be reused."""
+        links = [link for link in links if link]
+        if not links:
+            return {}
+        fresh_after = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.max_age_seconds)
+        try:
+            docs = self.collection.find(
+                {"link": {"$in": links}, "updated_at": {"$gte": fresh_after}},
+                {"_id": 0, **{field: 1 for field in PROFILE_FIELDS}}
+            )
+            return {doc["link"]: doc for doc in docs}
+        except Exception as e:
+            logger.warning("Profile store lookup failed.", extra={"error": str(e)})
+            return {}
+
+    def upsert_many(self, profiles: list):
+        now = datetime.datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"link": profile["link"]},
+                {"$set": {**{field: profile.get(field) for field in PROFILE_FIELDS}, "updated_at": now}},
+                upsert=True
+            )
+            for profile in profiles if profile.get("link")
+        ]
+        if not operations:
+            return
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Could not store profiles.", extra={"error": str(e)})
@@ -0,0 +1,269 @@
+# utils/rate_limit.py
+import contextlib
+import contextvars
+import email.utils
+import random
+import threading
+import time
+
+from langchain_core.runnables import RunnableLambda
+
+from config import (
+    SERPER_RATE_PER_SECOND, GITHUB_SEARCH_RATE_PER_SECOND, GITHUB_RATE_PER_SECOND, GROQ_RATE_PER_SECOND,
+    RATE_LIMIT_BURST, PROVIDER_MAX_RETRIES, PROVIDER_BACKOFF_BASE_SECONDS, PROVIDER_BACKOFF_MAX_SECONDS,
+    JOB_BUDGET_SERPER_CALLS, JOB_BUDGET_GITHUB_CALLS, JOB_BUDGET_GROQ_CALLS
+)
+from utils.logging_setup import get_logger
+from utils.metrics import registry, span
+
+logger = get_logger("rate_limit")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class BudgetExceeded(Exception):
+    """Raised when a job has used up its call budget for a provider."""
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` calls per second on average with bursts
+    of up to `capacity`. `pause(seconds)` blocks every caller, e.g. when the provider
+    itself has told us to back off.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+class JobBudget:
+    """Counts a job's calls per provider and refuses calls beyond the configured limits."""
+
+    def __init__(self, limits: dict):
+        self.limits = limits
+        self.used = {}
+        self._lock = threading.Lock()
+
+    def charge(self, key: str):
+        with self._lock:
+            limit = self.limits.get(key, 0)
+            if limit and self.used.get(key, 0) >= limit:
+                raise BudgetExceeded(f"Job budget of {limit} {key} calls exhausted.")
+            self.used[key] = self.used.get(key, 0) + 1
+
+    def exhausted(self, key: str) -> bool:
+        with self._lock:
+            limit = self.limits.get(key, 0)
+            return bool(limit) and self.used.get(key, 0) >= limit
+
+    def usage(self) -> dict:
+        with self._lock:
+            return dict(self.used)
+
+_current_budget = contextvars.ContextVar("job_budget", default=None)
+
+def default_job_budget() -> JobBudget:
+    return JobBudget({"serper": JOB_BUDGET_SERPER_CALLS, "github": JOB_BUDGET_GITHUB_CALLS, "groq": JOB_BUDGET_GROQ_CALLS})
+
+@contextlib.contextmanager
+def job_budget(budget: JobBudget):
+    """
+    Makes `budget` the active budget for provider calls made in this context. Thread
+    pools that should share it must run their tasks in a copy of the context.
+    """
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+def budget_exhausted(key: str) -> bool:
+    """True if the budget active in this context has no `key` calls left."""
+    budget = _current_budget.get()
+    return budget is not None and budget.exhausted(key)
+
+def _status_code(error: Exception):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def _is_connection_error(error: Exception) -> bool:
+    return type(error).__name__.endswith(("ConnectionError", "TimeoutError", "Timeout"))
+
+def retry_after_seconds(headers) -> float:
+    """
+    Returns how long the provider asked us to wait, from Retry-After (seconds or an
+    HTTP date) or, once the quota is used up, X-RateLimit-Reset (epoch seconds).
+    Returns None if the response does not say.
+    """
+    if not headers:
+        return None
+    retry_after = headers.get("Retry-After") or headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = headers.get("X-RateLimit-Reset") or headers.get("x-ratelimit-reset")
+    remaining = headers.get("X-RateLimit-Remaining") or headers.get("x-ratelimit-remaining")
+    if reset and remaining == "0":
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+class RateLimiter:
+    """
+    Wraps calls to one provider: charges the active job budget, waits for a token,
+    and retries rate-limited or transient failures. Waits requested by the provider
+    pause the whole bucket so concurrent callers slow down together; otherwise
+    retries back off exponentially with full jitter.
+    """
+
+    def __init__(self, provider: str, rate_per_second: float, burst: int = RATE_LIMIT_BURST,
+                 budget_key: str = None, max_retries: int = PROVIDER_MAX_RETRIES,
+                 backoff_base: float = PROVIDER_BACKOFF_BASE_SECONDS, backoff_max: float = PROVIDER_BACKOFF_MAX_SECONDS):
+        self.provider = provider
+        self.budget_key = budget_key or provider
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+
+    def _backoff(self, attempt: int, requested: float = None) -> float:
+        if requested is not None:
+            self.bucket.pause(requested)
+            return min(requested, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record_retry(self, attempt: int, delay: float, reason):
+        self.retries += 1
+        registry.inc("scoutly_provider_retries_total", provider=self.provider)
+        logger.warning("Provider call throttled or failed, retrying.", extra={
+            "provider": self.provider, "reason": str(reason), "retry": attempt + 1,
+            "max_retries": self.max_retries, "delay_seconds": round(delay, 2)
+        })
+
+    def _before_call(self):
+        budget = _current_budget.get()
+        if budget is not None:
+            try:
+                budget.charge(self.budget_key)
+            except BudgetExceeded:
+                registry.inc("scoutly_provider_budget_exhausted_total", provider=self.provider)
+                raise
+        self.bucket.acquire()
+        registry.inc("scoutly_provider_requests_total", provider=self.provider)
+
+    def call(self, fn, *args, **kwargs):
+        """Calls `fn`, retrying exceptions that carry a retryable status or are connection errors."""
+        for attempt in range(self.max_retries + 1):
+            self._before_call()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = _status_code(e)
+                retryable = status in RETRYABLE_STATUS_CODES or (status is None and _is_connection_error(e))
+                if not retryable or attempt == self.max_retries:
+                    raise
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                delay = self._backoff(attempt, retry_after_seconds(headers))
+                self._record_retry(attempt, delay, status or type(e).__name__)
+                time.sleep(delay)
+
+    def request(self, session, method: str, url: str, **kwargs):
+        """
+        Sends an HTTP request through `session`. Throttled and 5xx responses are
+        retried; the last response is returned as-is so callers can still use
+        raise_for_status().
+        """
+        for attempt in range(self.max_retries + 1):
+            self._before_call()
+            response = None
+            try:
+                response = session.request(method, url, **kwargs)
+            except Exception as e:
+                if not _is_connection_error(e) or attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                requested = retry_after_seconds(response.headers)
+                # GitHub signals primary and secondary rate limits with a 403 plus rate-limit headers
+                throttled = response.status_code in RETRYABLE_STATUS_CODES or (
+                    response.status_code == 403 and requested is not None
+                )
+                if not throttled or attempt == self.max_retries:
+                    return response
+                delay = self._backoff(attempt, requested)
+            self._record_retry(attempt, delay, response.status_code if response is not None else "connection error")
+            time.sleep(delay)
+
+class RateLimitedChatModel:
+    """
+    Wraps a chat model so every structured-output call goes through a RateLimiter.
+    Exposes `model_name` so cache keys stay the same as for the wrapped model.
+    """
+
+    def __init__(self, model, limiter: RateLimiter):
+        self.model = model
+        self.limiter = limiter
+        self.model_name = getattr(model, "model_name", None) or type(model).__name__
+
+    def with_structured_output(self, schema, **kwargs):
+        structured = self.model.with_structured_output(schema, **kwargs)
+
+        def invoke(inputs, config):
+            with span("llm_call"):
+                try:
+                    result = self.limiter.call(structured.invoke, inputs, config)
+                except Exception:
+                    registry.inc("scoutly_llm_calls_total", outcome="error")
+                    raise
+            registry.inc("scoutly_llm_calls_total", outcome="success")
+            return result
+
+        return RunnableLambda(invoke, name="rate_limited_structured_output")
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+_LIMITER_SETTINGS = {
+    "serper": {"rate_per_second": SERPER_RATE_PER_SECOND},
+    "github_search": {"rate_per_second": GITHUB_SEARCH_RATE_PER_SECOND, "budget_key": "github"},
+    "github": {"rate_per_second": GITHUB_RATE_PER_SECOND},
+    "groq": {"rate_per_second": GROQ_RATE_PER_SECOND},
+}
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Returns the process-wide RateLimiter for a provider, so all jobs share one bucket."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(provider, **_LIMITER_SETTINGS[provider])
+        return _limiters[provider]
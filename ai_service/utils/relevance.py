@@ -0,0 +1,66 @@
+# utils/relevance.py
+import re
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+# Role nouns such as "developer" are not stop words: in "Android developer" they carry meaning
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or our the their this to we with
+you your will who looking experience years year required preferred strong good
+""".split())
+
+# Titles that mean the same role count as the same term, so "Android developer" matches "Android engineer"
+ROLE_SYNONYMS = {"engineer": "developer", "programmer": "developer", "dev": "developer"}
+
+def tokenize(text: str) -> list:
+    """Lowercases and splits text, keeping tech tokens like 'c++', 'c#' and 'node.js' intact."""
+    tokens = [token.rstrip(".") for token in TOKEN_PATTERN.findall((text or "").lower())]
+    return [ROLE_SYNONYMS.get(token, token) for token in tokens if token and token not in STOP_WORDS]
+
+def tfidf_similarity(query: str, documents: list) -> np.ndarray:
+    """
+    Cosine similarity between `query` and each document under a TF-IDF model fitted
+    on the documents themselves. Returns an array of scores in [0, 1], one per document.
+    """
+    if not documents:
+        return np.zeros(0)
+
+    doc_tokens = [tokenize(doc) for doc in documents]
+    query_tokens = tokenize(query)
+    vocabulary = {token: i for i, token in enumerate(sorted(set(query_tokens).union(*doc_tokens)))}
+    if not vocabulary or not query_tokens:
+        return np.zeros(len(documents))
+
+    counts = np.zeros((len(documents), len(vocabulary)))
+    for row, tokens in enumerate(doc_tokens):
+        for token in tokens:
+            counts[row, vocabulary[token]] += 1
+    query_counts = np.zeros(len(vocabulary))
+    for token in query_tokens:
+        query_counts[vocabulary[token]] += 1
+
+    # Smoothed idf and sublinear tf, as in scikit-learn's TfidfVectorizer(sublinear_tf=True)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    doc_vectors = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0) * idf
+    query_vector = np.where(query_counts > 0, 1 + np.log(np.maximum(query_counts, 1)), 0) * idf
+
+    doc_norms = np.linalg.norm(doc_vectors, axis=1)
+    query_norm = np.linalg.norm(query_vector)
+    if query_norm == 0:
+        return np.zeros(len(documents))
+    doc_norms[doc_norms == 0] = 1
+    return (doc_vectors @ query_vector) / (doc_norms * query_norm)
+
+def select_relevant(query: str, documents: list, top_k: int, min_similarity: float) -> list:
+    """
+    Returns (index, similarity) for the documents worth scoring, most similar first:
+    at most `top_k` of them (0 means no limit), each with similarity >= `min_similarity`.
+    """
+    scores = tfidf_similarity(query, documents)
+    order = np.argsort(-scores, kind="stable")
+    keep = order[scores[order] >= min_similarity]
+    if top_k > 0:
+        keep = keep[:top_k]
+    return [(int(i), float(scores[i])) for i in keep]
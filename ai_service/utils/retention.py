@@ -0,0 +1,156 @@
+# utils/retention.py
+import datetime
+import gzip
+import json
+import os
+import time
+from pymongo import ASCENDING, ReturnDocument
+
+from config import (
+    RETENTION_PURGE_LEAD_SECONDS, RETENTION_PURGE_INTERVAL_SECONDS, RETENTION_PURGE_MAX_JOBS,
+    RETENTION_PURGE_BATCH_SIZE, RETENTION_PURGE_PAUSE_SECONDS, RETENTION_ARCHIVE_DIR
+)
+from utils.database import TalentPipelineDB, FINISHED_STATUSES
+from utils.logging_setup import get_logger
+from utils.metrics import registry
+
+logger = get_logger("retention")
+
+class RetentionPurger:
+    """
+    Removes expired and deleted jobs together with their candidates and events.
+
+    Finished jobs and their candidates carry an `expires_at` (see
+    TalentPipelineDB.finish_job), backed by TTL indexes. Workers run this purger
+    between jobs (run_if_due bounds each slice), so that `lead_seconds` before the
+    TTL monitor would act, expired jobs are archived (if `archive_dir` is set) and
+    then deleted a batch at a time with a pause in between, rather than in one
+    unbounded delete_many. Jobs deleted through the API are purged the same way,
+    without archiving. Each job is claimed with a short lease, so any number of
+    workers can share the work.
+    """
+
+    def __init__(self, db_instance: TalentPipelineDB, lead_seconds: int = RETENTION_PURGE_LEAD_SECONDS,
+                 interval_seconds: float = RETENTION_PURGE_INTERVAL_SECONDS, max_jobs: int = RETENTION_PURGE_MAX_JOBS,
+                 batch_size: int = RETENTION_PURGE_BATCH_SIZE, pause_seconds: float = RETENTION_PURGE_PAUSE_SECONDS,
+                 archive_dir: str = RETENTION_ARCHIVE_DIR, lease_seconds: int = 600):
+        self.jobs_collection = db_instance.jobs_collection
+        self.candidates_collection = db_instance.candidates_collection
+        self.events_collection = db_instance.db['job_events']
+        self.lead_seconds = lead_seconds
+        self.interval_seconds = interval_seconds
+        self.max_jobs = max_jobs
+        self.batch_size = max(1, batch_size)
+        self.pause_seconds = pause_seconds
+        self.archive_dir = archive_dir
+        self.lease_seconds = lease_seconds
+        self._last_run = None
+
+    def ensure_indexes(self):
+        self.jobs_collection.create_index("expires_at", expireAfterSeconds=0)
+        self.candidates_collection.create_index("expires_at", expireAfterSeconds=0)
+        self.jobs_collection.create_index("deleted_at", sparse=True)
+
+    def run_if_due(self, stop_event=None) -> int:
+        """Purges if `interval_seconds` have passed since the last run. Returns the number of jobs purged."""
+        now = time.monotonic()
+        if self._last_run is not None and now - self._last_run < self.interval_seconds:
+            return 0
+        self._last_run = now
+        return self.purge(stop_event)
+
+    def purge(self, stop_event=None) -> int:
+        """Purges up to `max_jobs` jobs, stopping early if `stop_event` is set. Returns the number purged."""
+        purged = 0
+        while purged < self.max_jobs and not (stop_event and stop_event.is_set()):
+            job = self._claim_next()
+            if not job:
+                break
+            try:
+                if self.purge_job(job, stop_event):
+                    purged += 1
+            except Exception as e:
+                # The lease runs out and a later run tries the job again
+                logger.warning("Could not purge job.", extra={"job_id": job["job_id"], "error": str(e)})
+        if purged:
+            logger.info("Purged jobs.", extra={"count": purged})
+        return purged
+
+    def _claim_next(self):
+        now = datetime.datetime.utcnow()
+        # A batch member's lease is held by its batch job, which may still be writing its candidates
+        running_batches = self.jobs_collection.distinct("job_id", {"kind": "batch", "worker_id": {"$exists": True}})
+        return self.jobs_collection.find_one_and_update(
+            {
+                # Jobs a worker is still running are purged once it lets go of them
+                "worker_id": {"$exists": False},
+                "batch_id": {"$nin": running_batches},
+                "$and": [
+                    {"$or": [
+                        {"deleted_at": {"$ne": None}},
+                        {"status": {"$in": list(FINISHED_STATUSES)},
+                         "expires_at": {"$lte": now + datetime.timedelta(seconds=self.lead_seconds)}}
+                    ]},
+                    {"$or": [{"purge_lease_until": {"$exists": False}}, {"purge_lease_until": {"$lt": now}}]}
+                ]
+            },
+            {"$set": {"purge_lease_until": now + datetime.timedelta(seconds=self.lease_seconds)}},
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def purge_job(self, job: dict, stop_event=None) -> bool:
+        """
+        Archives (expired jobs only) and deletes one job, its candidates and its
+        events. Returns False if it stopped part-way because `stop_event` was set.
+        """
+        job_id = job["job_id"]
+        reason = "deleted" if job.get("deleted_at") else "expired"
+        if reason == "expired" and self.archive_dir:
+            self.archive_job(job)
+
+        candidates = self._delete_in_batches(self.candidates_collection, {"job_id": job_id}, stop_event)
+        events = self._delete_in_batches(self.events_collection, {"job_id": job_id}, stop_event)
+        if candidates is None or events is None:
+            return False
+        self.jobs_collection.delete_one({"job_id": job_id})
+
+        registry.inc("scoutly_retention_purged_total", reason=reason, collection="jobs")
+        registry.inc("scoutly_retention_purged_total", candidates, reason=reason, collection="candidates")
+        logger.info("Purged job.", extra={"job_id": job_id, "reason": reason, "candidates": candidates})
+        return True
+
+    def _delete_in_batches(self, collection, query: dict, stop_event=None):
+        """Deletes matching documents `batch_size` at a time. Returns the count, or None if stopped."""
+        deleted = 0
+        while True:
+            ids = [doc["_id"] for doc in collection.find(query, {"_id": 1}).sort("_id", ASCENDING).limit(self.batch_size)]
+            if not ids:
+                return deleted
+            deleted += collection.delete_many({"_id": {"$in": ids}}).deleted_count
+            if len(ids) < self.batch_size:
+                return deleted
+            # Give other workloads room between batches
+            if stop_event is not None:
+                if stop_event.wait(self.pause_seconds):
+                    return None
+            else:
+                time.sleep(self.pause_seconds)
+
+    def archive_job(self, job: dict) -> str:
+        """
+        Writes a job and its candidates to `<archive_dir>/<job_id>.jsonl.gz`, one
+        JSON record per line: the job first, then each candidate. Candidates are
+        streamed in batches, and the file only appears once it is complete.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{job['job_id']}.jsonl.gz")
+        partial_path = path + ".partial"
+        with gzip.open(partial_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"type": "job", **job}, default=str) + "\n")
+            candidates = self.candidates_collection.find({"job_id": job["job_id"]}, {"_id": 0}).batch_size(self.batch_size)
+            for candidate in candidates:
+                f.write(json.dumps({"type": "candidate", **candidate}, default=str) + "\n")
+        os.replace(partial_path, path)
+        logger.info("Archived job.", extra={"job_id": job["job_id"], "path": path})
+        return path
@@ -0,0 +1,77 @@
+# utils/services.py
+import threading
+from langchain_groq import ChatGroq
+
+from agents.query_architect import QueryArchitect
+from agents.data_miner import DataMiner
+from agents.profile_ranker import ProfileRanker
+from utils.cache import LLMCache, SearchCache, MongoTTLCache
+from utils.database import TalentPipelineDB
+from utils.events import ensure_event_indexes
+from utils.http_client import build_http_session
+from utils.job_queue import JobQueue
+from utils.logging_setup import get_logger
+from utils.metrics import TokenUsageCallback
+from utils.profile_store import ProfileStore
+from utils.retention import RetentionPurger
+from utils.rate_limit import RateLimitedChatModel, get_rate_limiter
+from config import SERPER_API_KEY
+
+logger = get_logger("services")
+
+class Services:
+    """
+    Process-wide container for the expensive, thread-safe clients: the Mongo
+    connection pool, the pooled HTTP session, the Groq client, the LLM and search
+    caches and the cross-job profile store, plus the agents (and their prebuilt chains) that use them. Every job and
+    API request in the process shares one instance instead of constructing its own.
+    """
+
+    def __init__(self, db: TalentPipelineDB = None, llm=None, http_session=None, llm_cache: LLMCache = None):
+        self.db = db or TalentPipelineDB()
+        self.job_queue = JobQueue(self.db)
+        self.purger = RetentionPurger(self.db)
+        self.http_session = http_session or build_http_session()
+        # Retries are left to the shared Groq rate limiter, which also throttles and budgets every call
+        self.llm = llm or RateLimitedChatModel(
+            ChatGroq(model="llama-3.3-70b-versatile", temperature=0, max_retries=0, callbacks=[TokenUsageCallback()]),
+            get_rate_limiter("groq")
+        )
+        self.llm_cache = llm_cache or LLMCache.from_config(self.db.db['llm_cache'])
+        self.search_cache = SearchCache.from_config(self.db.db['search_cache'])
+        self.profile_store = ProfileStore(self.db.db['candidate_profiles'])
+
+        self.architect = QueryArchitect(model=self.llm, cache=self.llm_cache)
+        self.miner = DataMiner(
+            api_key=SERPER_API_KEY, session=self.http_session, search_cache=self.search_cache, profile_store=self.profile_store
+        )
+        self.ranker = ProfileRanker(model=self.llm, cache=self.llm_cache)
+
+_services = None
+_services_lock = threading.Lock()
+
+def get_services() -> Services:
+    """Returns the process-wide Services, creating it on first use."""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = Services()
+    return _services
+
+def set_services(services: Services):
+    """Replaces the process-wide Services, e.g. with stand-ins for benchmarks."""
+    global _services
+    with _services_lock:
+        _services = services
+
+def run_startup_migrations(db: TalentPipelineDB):
+    """One-time schema setup (indexes) for the API and worker processes."""
+    db.ensure_indexes()
+    JobQueue(db).ensure_indexes()
+    RetentionPurger(db).ensure_indexes()
+    MongoTTLCache(db.db['llm_cache'], ttl_seconds=0).ensure_indexes()
+    MongoTTLCache(db.db['search_cache'], ttl_seconds=0).ensure_indexes()
+    ProfileStore(db.db['candidate_profiles']).ensure_indexes()
+    ensure_event_indexes(db.db['job_events'])
+    logger.info("Startup migrations complete.")
@@ -1,44 +1,576 @@
+import argparse
+import contextvars
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from agents.query_architect import QueryArchitect
 from agents.data_miner import DataMiner
 from agents.profile_ranker import ProfileRanker
 from agents.pipeline_manager import PipelineManager
 from utils.database import TalentPipelineDB
-from config import SERPER_API_KEY
+from utils.events import JobEventPublisher
+from utils.job_queue import JobQueue
+from utils.pipeline import prefetch
+from utils.profile_store import profile_content_hash
+from utils.rate_limit import JobBudget, budget_exhausted, default_job_budget, job_budget
+from utils.logging_setup import configure_logging, get_logger, log_context
+from utils.metrics import JobTimings, job_timings, registry, span
+from utils.services import get_services, run_startup_migrations
+from config import (
+    WORKER_POLL_INTERVAL_SECONDS, MINER_TARGET_CANDIDATES, MINER_MAX_PAGES, MINER_PREFETCH_PAGES, HIGH_SCORE_THRESHOLD,
+    BATCH_MAX_CONCURRENT_SEARCHES
+)
+
+logger = get_logger("worker")
+
+def _scored_event(profile: dict) -> dict:
+    return {key: profile.get(key) for key in ("name", "title", "link", "source", "match_score", "reasoning")}
+
+def run_campaign(job_id: str, platform: str, job_prompt: str, db: TalentPipelineDB,
+                 architect: QueryArchitect, miner: DataMiner, ranker: ProfileRanker,
+                 events: JobEventPublisher, target_candidates: int = MINER_TARGET_CANDIDATES,
+                 job_spec: dict = None) -> bool:
+    """
+    Runs one platform campaign end to end and records its outcome on the job
+    document. Result pages are mined on a background thread while earlier pages are
+    ranked and stored, and mining stops early once `target_candidates` profiles have
+    scored at least HIGH_SCORE_THRESHOLD, the campaign's scoring budget is used up,
+    or the job has no LLM calls left (recorded as `budget_exhausted`). Each page
+    scores its share of the budget; what is left once mining stops goes to the best
+    profiles held back from earlier pages (see ScoringShortlist). Profiles that
+    could not be scored are stored with `score_failed` and no match_score or
+    content hash, so the next run (or refresh) scores them again. `job_spec` is the prompt's extracted spec (None if extraction failed).
+    Mining always starts from the first result page; profiles already stored for
+    the job are only rescored if their text changed, which is what keeps a
+    refresh incremental. Returns True if the campaign completed.
+    """
+    with log_context(platform=platform), span("campaign"):
+        return _run_campaign(job_id, platform, job_prompt, db, architect, miner, ranker, events, target_candidates, job_spec)
+
+def _run_campaign(job_id, platform, job_prompt, db, architect, miner, ranker, events, target_candidates, job_spec) -> bool:
+    logger.info("Running campaign.")
+    try:
+        db.update_campaign_status(job_id, platform, "running")
+        events.publish("campaign_started", platform=platform)
+        manager = PipelineManager(db_instance=db, job_id=job_id)
+
+        with span("query_build"):
+            search_query = architect.build_query(job_spec, platform, job_prompt)
+        events.publish("query_built", platform=platform, query=search_query)
+
+        # Candidates already stored for the job: GitHub only looks them up in the
+        # bulk query, and they are only scored again if their title or snippet changed
+        stored_hashes = db.get_candidate_hashes(job_id)
+
+        counts = {"scored": 0, "high_scoring": 0, "unscored": 0}
+        # Stored profiles whose text changed; they are rescored and their rows updated
+        changed_links = set()
+        on_scored = lambda profile: events.publish("profile_scored", platform=platform, candidate=_scored_event(profile))
+
+        def store(ranked_profiles: list):
+            # Profiles that could not be scored are stored without a content hash, so the
+            # next run scores them again; a changed profile keeps its old row until then
+            failed = [p for p in ranked_profiles if p.get('score_failed')]
+            ranked_profiles = [p for p in ranked_profiles if not p.get('score_failed')]
+            new_failed = [p for p in failed if p.get('link') not in changed_links]
+            for profile in ranked_profiles:
+                stored_hashes[profile.get('link')] = profile_content_hash(profile)
+            manager.add([p for p in ranked_profiles if p.get('link') not in changed_links] + new_failed)
+            manager.update([p for p in ranked_profiles if p.get('link') in changed_links])
+            # If this run scores one of them after all, its row is updated rather than inserted
+            for profile in new_failed:
+                stored_hashes[profile.get('link')] = None
+                changed_links.add(profile.get('link'))
+            counts["unscored"] += len(failed)
+            counts["scored"] += len(ranked_profiles)
+            counts["high_scoring"] += sum(1 for p in ranked_profiles if (p.get('match_score') or 0) >= HIGH_SCORE_THRESHOLD)
+
+        mined, pages, unchanged = 0, 0, 0
+        out_of_budget, reached_target = False, False
+        shortlist = ranker.new_shortlist(MINER_MAX_PAGES)
+        pages_iter = miner.iter_profile_pages(search_query, platform, skip_links=stored_hashes)
+        for raw_profiles in prefetch(pages_iter, MINER_PREFETCH_PAGES):
+            pages += 1
+            mined += len(raw_profiles)
+            events.publish("profiles_mined", platform=platform, page=pages, count=len(raw_profiles))
+
+            to_score = []
+            for profile in raw_profiles:
+                if profile.get('link') not in stored_hashes:
+                    to_score.append(profile)
+                elif stored_hashes[profile.get('link')] != profile_content_hash(profile):
+                    to_score.append(profile)
+                    changed_links.add(profile.get('link'))
+                else:
+                    unchanged += 1
+
+            store(ranker.rank_profiles(to_score, job_prompt, on_scored=on_scored, job_spec=job_spec, shortlist=shortlist))
+
+            if counts["high_scoring"] >= target_candidates:
+                logger.info("Campaign reached its target; stopping early.", extra={"strong_candidates": counts["high_scoring"], "pages": pages})
+                reached_target = True
+                break
+            if shortlist.remaining == 0:
+                logger.info("Campaign used up its scoring budget; stopping early.", extra={"profiles_scored": counts["scored"], "pages": pages})
+                break
+            if budget_exhausted("groq"):
+                logger.warning("Job ran out of LLM calls; stopping the campaign.", extra={"profiles_unscored": counts["unscored"], "pages": pages})
+                out_of_budget = True
+                break
+
+        if not reached_target and not out_of_budget:
+            # A held back profile may have been scored since, if a later page listed it again
+            held_back = [p for p in shortlist.drain() if stored_hashes.get(p.get('link')) != profile_content_hash(p)]
+            if held_back:
+                logger.info("Scoring the best profiles held back from earlier pages.", extra={"count": len(held_back)})
+                store(ranker.score_for_prompts([(job_prompt, job_spec)], [held_back], on_scored=lambda _, p: on_scored(p))[0])
+
+        totals = dict(manager.flush())
+        events.publish("candidates_stored", platform=platform, **totals)
+
+        db.update_campaign_status(
+            job_id, platform, "completed", pages_mined=pages, profiles_found=mined, profiles_scored=counts["scored"],
+            strong_candidates=counts["high_scoring"], candidates_inserted=totals["inserted"], duplicates_skipped=totals["duplicates"],
+            candidates_updated=totals["updated"], profiles_unchanged=unchanged, profiles_unscored=counts["unscored"],
+            budget_exhausted=out_of_budget, search_query=search_query
+        )
+        events.publish("campaign_completed", platform=platform)
+        logger.info("Campaign completed.", extra={
+            "pages": pages, "profiles_found": mined, "profiles_unchanged": unchanged,
+            "strong_candidates": counts["high_scoring"]
+        })
+        return True
+    except Exception as e:
+        logger.exception("Campaign failed.")
+        db.update_campaign_status(job_id, platform, "failed", error=str(e))
+        events.publish("campaign_failed", platform=platform, error=str(e))
+        return False
+
+def _job_campaigns(linkedin_prompt: str, github_prompt: str) -> list:
+    campaigns = []
+    if linkedin_prompt:
+        campaigns.append({"platform": "linkedin", "job_prompt": linkedin_prompt})
+    if github_prompt:
+        campaigns.append({"platform": "github", "job_prompt": github_prompt})
+    return campaigns
+
+def _final_status(outcomes: list) -> str:
+    """Job status from the outcomes (True = completed) of its campaigns."""
+    if all(outcomes):
+        return "completed"
+    if any(outcomes):
+        return "partially_completed"
+    return "failed"
+
+def _extract_prompt_specs(prompts: list, architect: QueryArchitect) -> dict:
+    """Extracts each distinct prompt's job spec exactly once, in parallel. Returns {prompt: job_spec or None}."""
+    prompts = list(dict.fromkeys(prompts))
+    if not prompts:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, architect.extract_job_spec, p) for p in prompts]
+        return {prompt: future.result() for prompt, future in zip(prompts, futures)}
+
+def _extract_job_specs(job_id: str, campaigns: list, stored_specs: dict, architect: QueryArchitect,
+                       db: TalentPipelineDB, events: JobEventPublisher) -> dict:
+    """
+    Returns {platform: job_spec}, reusing specs already stored on the job and
+    extracting each distinct remaining prompt exactly once (in parallel), so
+    platforms that share a prompt also share its LLM call. New specs are saved.
+    """
+    specs = {c["platform"]: stored_specs[c["platform"]] for c in campaigns if stored_specs.get(c["platform"])}
+    extracted = _extract_prompt_specs([c["job_prompt"] for c in campaigns if c["platform"] not in specs], architect)
+    if not extracted:
+        return specs
+
+    new_specs = {}
+    for c in campaigns:
+        if c["platform"] not in specs and extracted.get(c["job_prompt"]):
+            new_specs[c["platform"]] = extracted[c["job_prompt"]]
+    db.save_job_specs(job_id, new_specs)
+    for platform, spec in new_specs.items():
+        events.publish("job_spec_extracted", platform=platform, job_spec=spec)
+    specs.update(new_specs)
+    return specs
+
+def _run_campaigns(job_id: str, linkedin_prompt: str, github_prompt: str, target_candidates: int,
+                   services, events: JobEventPublisher, stored_specs: dict = None) -> str:
+    db = services.db
+    architect, miner, ranker = services.architect, services.miner, services.ranker
+
+    campaigns = _job_campaigns(linkedin_prompt, github_prompt)
+    job_specs = _extract_job_specs(job_id, campaigns, stored_specs or {}, architect, db, events)
+
+    # Campaigns are independent pipelines, so run them side by side and only
+    # settle the job status once every one of them has finished. Each runs in a
+    # copy of this context so its provider calls count against the job's budget.
+    with ThreadPoolExecutor(max_workers=max(1, len(campaigns))) as executor:
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                run_campaign, job_id, c["platform"], c["job_prompt"], db, architect, miner, ranker, events,
+                target_candidates or MINER_TARGET_CANDIDATES, job_specs.get(c["platform"])
+            )
+            for c in campaigns
+        ]
+        outcomes = [future.result() for future in futures]
+    return _final_status(outcomes)
+
+def run_sourcing_task(job_id: str, linkedin_prompt: str, github_prompt: str, target_candidates: int = None) -> str:
+    """
+    Runs every campaign of a job and returns the job's final status. The job's
+    Serper, GitHub and Groq calls are counted against a per-job budget, and the
+    usage is recorded on the job document as `api_usage`, next to the total time
+    spent in each pipeline stage (`stage_timings`).
+    """
+    with log_context(job_id=job_id):
+        return _run_sourcing_task(job_id, linkedin_prompt, github_prompt, target_candidates)
+
+def _run_sourcing_task(job_id: str, linkedin_prompt: str, github_prompt: str, target_candidates: int = None) -> str:
+    logger.info("Starting sourcing job.")
+    services = get_services()
+    db = services.db
+    events = JobEventPublisher(db.db['job_events'], job_id)
+    budget = default_job_budget()
+    timings = JobTimings()
 
-def run_sourcing_task(job_id: str, linkedin_prompt: str, github_prompt: str):
-    print(f"Starting background task for job_id: {job_id}")
-    db = TalentPipelineDB()
-    
     try:
         db.update_job_status(job_id, "running")
+        events.publish("job_started")
 
-        architect = QueryArchitect()
-        miner = DataMiner(api_key=SERPER_API_KEY)
-        ranker = ProfileRanker()
-        manager = PipelineManager(db_instance=db, job_id=job_id)
+        job = db.get_job(job_id) or {}
+        with job_budget(budget), job_timings(timings), span("job"):
+            status = _run_campaigns(
+                job_id, linkedin_prompt, github_prompt, target_candidates, services, events, job.get("job_specs")
+            )
+
+        db.finish_job(job_id, status, api_usage=budget.usage(), stage_timings=timings.as_dict())
+        events.publish("job_finished", status=status)
+        registry.inc("scoutly_jobs_finished_total", status=status)
+        logger.info("Sourcing job finished.", extra={"status": status})
+        return status
+
+    except Exception as e:
+        logger.exception("Sourcing job failed.")
+        db.finish_job(job_id, "failed", api_usage=budget.usage(), stage_timings=timings.as_dict())
+        events.publish("job_finished", status="failed", error=str(e))
+        registry.inc("scoutly_jobs_finished_total", status="failed")
+        return "failed"
+
+def run_shared_campaign(platform: str, search_query: str, campaigns: list, db: TalentPipelineDB,
+                        miner: DataMiner, ranker: ProfileRanker, events: dict) -> dict:
+    """
+    Runs one search on behalf of every batch campaign that built the same query.
+    Result pages are mined once, each page is scored against all the distinct
+    prompts in a single batched LLM pass, and the ranked profiles are stored for
+    each campaign's own job. A campaign stops taking profiles once it has its
+    target of strong candidates or has used up its scoring budget, and mining
+    stops once they all have. As in run_campaign, each page scores its share of
+    the budget and the rest goes to the best held back profiles at the end. `campaigns`
+    are dicts with job_id, job_prompt, job_spec and target_candidates; `events`
+    maps job ids to their publishers. Returns {job_id: completed}.
+    """
+    with log_context(platform=platform), span("campaign"):
+        return _run_shared_campaign(platform, search_query, campaigns, db, miner, ranker, events)
+
+def _run_shared_campaign(platform, search_query, campaigns, db, miner, ranker, events) -> dict:
+    logger.info("Running shared campaign.", extra={"jobs": len(campaigns), "query": search_query})
+    progress = {}
+    try:
+        for c in campaigns:
+            job_id = c["job_id"]
+            progress[job_id] = {
+                "manager": PipelineManager(db_instance=db, job_id=job_id), "mined": 0, "scored": 0, "unscored": 0,
+                "high_scoring": 0, "pages": 0, "budget_exhausted": False
+            }
+            db.update_campaign_status(job_id, platform, "running", shared_search_jobs=len(campaigns))
+            events[job_id].publish("campaign_started", platform=platform)
+            events[job_id].publish("query_built", platform=platform, query=search_query)
+
+        # Campaigns with the same prompt share its scores; its spec was extracted once for the batch.
+        # They have scored the same pages, so they share a scoring budget too.
+        shortlists = {c["job_prompt"]: ranker.new_shortlist(MINER_MAX_PAGES) for c in campaigns}
 
-        campaigns = []
-        if linkedin_prompt:
-            campaigns.append({"platform": "linkedin", "job_prompt": linkedin_prompt})
-        if github_prompt:
-            campaigns.append({"platform": "github", "job_prompt": github_prompt})
-        
-        for campaign in campaigns:
-            platform = campaign["platform"]
-            job_prompt = campaign["job_prompt"]
-            print(f"\n Running campaign for: {platform.upper()} (Job ID: {job_id})")
-            
-            search_query = architect.create_query(job_prompt, platform=platform)
-            
-            raw_profiles = miner.search_for_profiles(search_query, platform, job_prompt)
-            
-            ranked_profiles = ranker.rank_profiles(raw_profiles, job_prompt)
-            manager.process_and_store(ranked_profiles)
-
-        db.update_job_status(job_id, "completed")
-        print(f"Background task for job_id: {job_id} completed successfully.")
+        def score_and_store(active: list, select):
+            """Scores what `select(prompt_order)` picks for each distinct prompt and stores it for every active campaign."""
+            prompts = {}
+            for c in active:
+                prompts.setdefault(c["job_prompt"], c["job_spec"])
+            prompt_order = list(prompts)
 
+            def publish_scored(index: int, profile: dict):
+                for c in active:
+                    if c["job_prompt"] == prompt_order[index]:
+                        events[c["job_id"]].publish("profile_scored", platform=platform, candidate=_scored_event(profile))
+
+            ranked = select(list(prompts.items()), [shortlists[prompt] for prompt in prompt_order], publish_scored)
+            for c in active:
+                state = progress[c["job_id"]]
+                # Each job stores its own copies, since storing tags a profile with its job_id
+                prompt_ranked = ranked[prompt_order.index(c["job_prompt"])]
+                ranked_profiles = [dict(p) for p in prompt_ranked]
+                scored = [p for p in ranked_profiles if not p.get('score_failed')]
+                # Unscored profiles are stored too, without a content hash, so a refresh scores them
+                state["manager"].add(ranked_profiles)
+                state["unscored"] += len(ranked_profiles) - len(scored)
+                state["scored"] += len(scored)
+                state["high_scoring"] += sum(1 for p in scored if (p.get('match_score') or 0) >= HIGH_SCORE_THRESHOLD)
+
+        active = list(campaigns)
+        out_of_budget = False
+        for raw_profiles in prefetch(miner.iter_profile_pages(search_query, platform), MINER_PREFETCH_PAGES):
+            for c in active:
+                state = progress[c["job_id"]]
+                state["pages"] += 1
+                state["mined"] += len(raw_profiles)
+                events[c["job_id"]].publish("profiles_mined", platform=platform, page=state["pages"], count=len(raw_profiles))
+
+            score_and_store(active, lambda prompts, page_shortlists, on_scored: ranker.rank_for_prompts(
+                raw_profiles, prompts, on_scored=on_scored, shortlists=page_shortlists
+            ))
+
+            active = [
+                c for c in active
+                if progress[c["job_id"]]["high_scoring"] < c["target_candidates"] and shortlists[c["job_prompt"]].remaining != 0
+            ]
+            if active and budget_exhausted("groq"):
+                logger.warning("Batch ran out of LLM calls; stopping the shared campaign.", extra={"jobs": len(active)})
+                for c in active:
+                    progress[c["job_id"]]["budget_exhausted"] = True
+                out_of_budget = True
+                break
+            if not active:
+                logger.info("Every campaign sharing the search is done; stopping early.")
+                break
+
+        if active and not out_of_budget:
+            # Campaigns still short of their target get the best profiles held back from earlier pages
+            score_and_store(active, lambda prompts, page_shortlists, on_scored: ranker.score_for_prompts(
+                prompts, [shortlist.drain() for shortlist in page_shortlists], on_scored=on_scored
+            ))
+
+        outcomes = {}
+        for c in campaigns:
+            job_id, state = c["job_id"], progress[c["job_id"]]
+            totals = dict(state["manager"].flush())
+            events[job_id].publish("candidates_stored", platform=platform, **totals)
+            db.update_campaign_status(
+                job_id, platform, "completed", pages_mined=state["pages"], profiles_found=state["mined"],
+                profiles_scored=state["scored"], strong_candidates=state["high_scoring"],
+                candidates_inserted=totals["inserted"], duplicates_skipped=totals["duplicates"],
+                profiles_unscored=state["unscored"], budget_exhausted=state["budget_exhausted"],
+                search_query=search_query
+            )
+            events[job_id].publish("campaign_completed", platform=platform)
+            outcomes[job_id] = True
+        logger.info("Shared campaign completed.", extra={"jobs": len(campaigns)})
+        return outcomes
     except Exception as e:
-        print(f"Background task for job_id: {job_id} failed: {e}")
-        db.update_job_status(job_id, "failed")
\ No newline at end of file
+        logger.exception("Shared campaign failed.")
+        for c in campaigns:
+            db.update_campaign_status(c["job_id"], platform, "failed", error=str(e))
+            events[c["job_id"]].publish("campaign_failed", platform=platform, error=str(e))
+        return {c["job_id"]: False for c in campaigns}
+
+def _run_batch_campaigns(jobs: list, services, events: dict) -> dict:
+    db = services.db
+    architect, miner, ranker = services.architect, services.miner, services.ranker
+
+    campaigns = []
+    for job in jobs:
+        stored_specs = job.get("job_specs") or {}
+        for c in _job_campaigns(job.get("linkedin_prompt"), job.get("github_prompt")):
+            c.update(
+                job_id=job["job_id"], job_spec=stored_specs.get(c["platform"]),
+                target_candidates=job.get("target_candidates") or MINER_TARGET_CANDIDATES
+            )
+            campaigns.append(c)
+
+    # One spec per distinct prompt across the whole batch
+    extracted = _extract_prompt_specs([c["job_prompt"] for c in campaigns if not c["job_spec"]], architect)
+    for c in campaigns:
+        if not c["job_spec"] and extracted.get(c["job_prompt"]):
+            c["job_spec"] = extracted[c["job_prompt"]]
+            db.save_job_specs(c["job_id"], {c["platform"]: c["job_spec"]})
+            events[c["job_id"]].publish("job_spec_extracted", platform=c["platform"], job_spec=c["job_spec"])
+
+    # Campaigns that build the same query share a single search
+    searches = {}
+    for c in campaigns:
+        with span("query_build"):
+            search_query = architect.build_query(c["job_spec"], c["platform"], c["job_prompt"])
+        searches.setdefault((c["platform"], search_query), []).append(c)
+    logger.info("Grouped batch campaigns into shared searches.", extra={"campaigns": len(campaigns), "searches": len(searches)})
+
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(searches), BATCH_MAX_CONCURRENT_SEARCHES))) as executor:
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                run_shared_campaign, platform, search_query, group, db, miner, ranker, events
+            )
+            for (platform, search_query), group in searches.items()
+        ]
+        for future in futures:
+            for job_id, completed in future.result().items():
+                outcomes.setdefault(job_id, []).append(completed)
+    return {job["job_id"]: _final_status(outcomes.get(job["job_id"], [])) for job in jobs}
+
+def run_batch_task(batch_id: str, job_ids: list) -> str:
+    """
+    Runs the jobs of a batch submission together and returns the batch's status.
+    Each distinct prompt's spec is extracted once, and campaigns that build the
+    same platform query share one search (see run_shared_campaign), while every
+    job keeps its own campaigns, status, events and candidates. Provider calls
+    count against one budget sized for the whole batch; `api_usage` and
+    `stage_timings` are recorded on the batch job.
+    """
+    with log_context(batch_id=batch_id):
+        return _run_batch_task(batch_id, job_ids)
+
+def _run_batch_task(batch_id: str, job_ids: list) -> str:
+    logger.info("Starting batch.", extra={"jobs": len(job_ids)})
+    services = get_services()
+    db = services.db
+    # Jobs deleted since the batch was submitted are skipped
+    jobs = [job for job in (db.get_job(job_id) for job_id in job_ids) if job]
+    events = {job["job_id"]: JobEventPublisher(db.db['job_events'], job["job_id"]) for job in jobs}
+    budget = JobBudget({key: limit * len(jobs) for key, limit in default_job_budget().limits.items()})
+    timings = JobTimings()
+
+    try:
+        db.update_job_status(batch_id, "running")
+        for job in jobs:
+            db.update_job_status(job["job_id"], "running")
+            events[job["job_id"]].publish("job_started", batch_id=batch_id)
+
+        with job_budget(budget), job_timings(timings), span("job"):
+            statuses = _run_batch_campaigns(jobs, services, events)
+
+        for job_id, status in statuses.items():
+            db.finish_job(job_id, status)
+            events[job_id].publish("job_finished", status=status)
+            registry.inc("scoutly_jobs_finished_total", status=status)
+
+        if all(status == "completed" for status in statuses.values()):
+            status = "completed"
+        elif all(status == "failed" for status in statuses.values()):
+            status = "failed"
+        else:
+            status = "partially_completed"
+        db.finish_job(batch_id, status, api_usage=budget.usage(), stage_timings=timings.as_dict())
+        logger.info("Batch finished.", extra={"status": status})
+        return status
+
+    except Exception as e:
+        logger.exception("Batch failed.")
+        for job in jobs:
+            db.finish_job(job["job_id"], "failed")
+            events[job["job_id"]].publish("job_finished", status="failed", error=str(e))
+            registry.inc("scoutly_jobs_finished_total", status="failed")
+        db.finish_job(batch_id, "failed", api_usage=budget.usage(), stage_timings=timings.as_dict())
+        return "failed"
+
+def _keep_lease_alive(queue: JobQueue, job_id: str, worker_id: str, done: threading.Event):
+    while not done.wait(queue.lease_seconds / 3):
+        if not queue.renew_lease(job_id, worker_id):
+            logger.warning("Lost the lease on job.", extra={"worker_id": worker_id, "job_id": job_id})
+            return
+
+def worker_loop(worker_id: str, stop_event=None, poll_interval: float = WORKER_POLL_INTERVAL_SECONDS):
+    """Claims and runs jobs from the queue until `stop_event` is set."""
+    stop_event = stop_event or threading.Event()
+    services = get_services()
+    db, queue = services.db, services.job_queue
+    logger.info("Worker started.", extra={"worker_id": worker_id, "poll_interval_seconds": poll_interval})
+
+    while not stop_event.is_set():
+        # Purging expired and deleted jobs takes a bounded slice between jobs, so it
+        # keeps up (ahead of the TTL indexes) however busy the queue is
+        try:
+            if services.purger.run_if_due(stop_event):
+                registry.flush(db.db['metrics'])
+        except Exception as e:
+            logger.warning("Retention purge failed.", extra={"worker_id": worker_id, "error": str(e)})
+        if stop_event.is_set():
+            break
+
+        try:
+            job = queue.claim(worker_id)
+        except Exception as e:
+            logger.warning("Could not claim a job.", extra={"worker_id": worker_id, "error": str(e)})
+            job = None
+
+        if not job:
+            stop_event.wait(poll_interval)
+            continue
+
+        job_id = job["job_id"]
+        logger.info("Claimed job.", extra={"worker_id": worker_id, "job_id": job_id, "attempt": job['attempts']})
+        done = threading.Event()
+        heartbeat = threading.Thread(target=_keep_lease_alive, args=(queue, job_id, worker_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            if job.get("kind") == "batch":
+                status = run_batch_task(job_id, job.get("job_ids", []))
+            else:
+                status = run_sourcing_task(
+                    job_id, job.get("linkedin_prompt"), job.get("github_prompt"), job.get("target_candidates")
+                )
+        finally:
+            done.set()
+            heartbeat.join()
+
+        job_doc = db.get_job(job_id) or {}
+        errors = [c.get("error") for c in job_doc.get("campaigns", {}).values() if c.get("error")]
+        queue.release(job, worker_id, status, error="; ".join(errors) or None)
+
+        try:
+            services.llm_cache.flush_stats(db.db['cache_stats'])
+            services.search_cache.flush_stats(db.db['cache_stats'])
+            registry.flush(db.db['metrics'])
+        except Exception as e:
+            logger.warning("Could not record cache stats and metrics.", extra={"worker_id": worker_id, "error": str(e)})
+
+    logger.info("Worker stopped.", extra={"worker_id": worker_id})
+
+def _run_worker_process(index: int):
+    configure_logging()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    worker_loop(f"{socket.gethostname()}-{os.getpid()}-{index}", stop_event)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run sourcing job workers against the shared job queue.")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes to start on this node.")
+    args = parser.parse_args()
+    configure_logging()
+
+    # Run the migrations on a short-lived client: MongoClient must not be shared across fork()
+    db = TalentPipelineDB()
+    run_startup_migrations(db)
+    db.client.close()
+
+    if args.processes <= 1:
+        _run_worker_process(0)
+        return
+
+    processes = [multiprocessing.Process(target=_run_worker_process, args=(i,)) for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()